@@ -0,0 +1,204 @@
+from engines import ENGINES, make_solver
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+
+
+# Fixed reference positions on the 8x8 board, name -> board. The partial boards are the first 3, 6 and 9
+# pieces of one solution in the order the search places them, the unsolvable ones pass the island check but
+# have no way to finish. They're written out here so a change to the search can't change the corpus.
+CORPUS = {
+    "empty": [[0] * 8 for _ in range(8)],
+
+    "depth_3": [[1, 1, 4, 4, 4, 4, 4, 7],
+                [1, 1, 0, 0, 0, 7, 7, 7],
+                [0, 0, 0, 0, 0, 0, 0, 7],
+                [0, 0, 0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0, 0]],
+
+    "depth_6": [[1, 1, 4, 4, 4, 4, 4, 7],
+                [1, 1, 10, 10, 9, 7, 7, 7],
+                [12, 10, 10, 9, 9, 0, 0, 7],
+                [12, 12, 10, 9, 9, 0, 0, 0],
+                [12, 0, 0, 0, 0, 0, 0, 0],
+                [12, 0, 0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0, 0]],
+
+    "depth_9": [[1, 1, 4, 4, 4, 4, 4, 7],
+                [1, 1, 10, 10, 9, 7, 7, 7],
+                [12, 10, 10, 9, 9, 6, 6, 7],
+                [12, 12, 10, 9, 9, 11, 6, 6],
+                [12, 13, 13, 0, 11, 11, 0, 6],
+                [12, 13, 0, 0, 11, 0, 0, 0],
+                [13, 13, 0, 0, 11, 0, 0, 0],
+                [0, 0, 0, 0, 0, 0, 0, 0]],
+
+    "unsolvable_3a": [[1, 1, 5, 5, 9, 9, 9, 0],
+                      [1, 1, 0, 5, 0, 9, 9, 0],
+                      [0, 0, 0, 5, 0, 0, 0, 0],
+                      [0, 0, 0, 5, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0, 0]],
+
+    "unsolvable_3b": [[2, 2, 2, 4, 5, 0, 0, 0],
+                      [2, 0, 0, 4, 5, 0, 0, 0],
+                      [2, 0, 0, 4, 5, 0, 0, 0],
+                      [0, 0, 0, 4, 5, 5, 0, 0],
+                      [0, 0, 0, 4, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0, 0],
+                      [0, 0, 0, 0, 0, 0, 0, 0]],
+
+    "unsolvable_5": [[1, 1, 2, 2, 2, 8, 8, 8],
+                     [1, 1, 2, 5, 9, 8, 0, 8],
+                     [0, 0, 2, 5, 9, 9, 0, 0],
+                     [0, 0, 0, 5, 9, 9, 0, 0],
+                     [0, 0, 0, 5, 5, 0, 0, 0],
+                     [0, 0, 0, 0, 0, 0, 0, 0],
+                     [0, 0, 0, 0, 0, 0, 0, 0],
+                     [0, 0, 0, 0, 0, 0, 0, 0]],
+}
+
+# how often, in nodes, the search stops to check its budget
+CHECK_EVERY = 1_000
+
+
+def run_position(engine, board, time_budget=30.0, max_nodes=None, trace_memory=False):
+    # searches one position until every solution is found or the budget runs out
+
+    # tracing starts before the solver is built, since some engines build their tables up front and others
+    # while searching
+    if trace_memory:
+        tracemalloc.start()
+    setup_start = time.perf_counter()
+    solver = make_solver(engine)
+    solver.quiet = True
+    placed = {val for row in board for val in row if val}
+    pieces = [piece_positions for piece_positions in solver.piece_positions
+              if solver.piece_value(piece_positions) not in placed]
+    setup = time.perf_counter() - setup_start
+    build_memory = tracemalloc.get_traced_memory()[0] if trace_memory else None
+
+    # the progress hook every engine calls doubles as the budget check
+    deadline = time.perf_counter() + time_budget
+
+    def check_budget():
+        if time.perf_counter() > deadline or (max_nodes is not None and solver.iterations >= max_nodes):
+            solver.terminate = True
+
+    solver.report_progress = check_budget
+    solver.progress_every = CHECK_EVERY
+
+    start = time.perf_counter()
+    first_solution = None
+    solutions = 0
+    for _ in solver.iter_solutions([[val for val in row] for row in board], pieces):
+        if first_solution is None:
+            first_solution = time.perf_counter() - start
+        solutions += 1
+    elapsed = time.perf_counter() - start
+    peak_memory = None
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    exhausted = not solver.terminate
+    return {
+        "setup_seconds": setup,
+        "nodes": solver.iterations,
+        "seconds": elapsed,
+        "nodes_per_second": solver.iterations / max(elapsed, 1e-9),
+        "solutions": solutions,
+        "first_solution_seconds": first_solution,
+        "exhausted": exhausted,
+        "exhaustion_seconds": elapsed if exhausted else None,
+        "build_memory_bytes": build_memory,
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def run_benchmarks(engines=tuple(ENGINES), positions=tuple(CORPUS), time_budget=30.0, memory=True):
+    # tracemalloc slows the search down a lot, so memory comes from a second run over the same number of
+    # nodes rather than from the timed one. Build memory is what the solver holds once it's made, peak memory
+    # the most held at once from the start of the build to the end of the search.
+    results = []
+    for engine in engines:
+        for position in positions:
+            result = run_position(engine, CORPUS[position], time_budget)
+            if memory:
+                memory_result = run_position(engine, CORPUS[position], float("inf"), result["nodes"], True)
+                result["build_memory_bytes"] = memory_result["build_memory_bytes"]
+                result["peak_memory_bytes"] = memory_result["peak_memory_bytes"]
+            results.append({"engine": engine, "position": position, **result})
+            yield results[-1]
+
+
+def commit_id():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_results, new_results, tolerance=0.1):
+    # (engine, position, old nodes per second, new nodes per second) for every run that slowed down by more
+    # than tolerance
+    old_speeds = {(result["engine"], result["position"]): result["nodes_per_second"] for result in old_results}
+    regressions = []
+    for result in new_results:
+        old_speed = old_speeds.get((result["engine"], result["position"]))
+        if old_speed and result["nodes_per_second"] < old_speed * (1 - tolerance):
+            regressions.append((result["engine"], result["position"], old_speed, result["nodes_per_second"]))
+    return regressions
+
+
+def format_seconds(seconds):
+    return "-" if seconds is None else f"{seconds:.3f}s"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the solver engines on a fixed set of positions")
+    parser.add_argument("--engines", choices=ENGINES, nargs="+", default=list(ENGINES), help="engines to benchmark")
+    parser.add_argument("--positions", choices=CORPUS, nargs="+", default=list(CORPUS), help="positions to search")
+    parser.add_argument("--time-budget", type=float, default=30.0, help="seconds to search each position for")
+    parser.add_argument("--no-memory", action="store_true", help="skip the second run that measures memory")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    parser.add_argument("--compare", help="results from an earlier run to check for slowdowns against")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="fraction of nodes per second a run can lose before it counts as a slowdown")
+    args = parser.parse_args()
+
+    results = []
+    for result in run_benchmarks(args.engines, args.positions, args.time_budget, not args.no_memory):
+        results.append(result)
+        build_memory, peak_memory = (
+            "-" if result[key] is None else f"{result[key] / 2 ** 20:,.1f}MiB"
+            for key in ("build_memory_bytes", "peak_memory_bytes"))
+        print(f"{result['engine']:<12} {result['position']:<14} Nodes: {result['nodes']:>11,}  "
+              f"Nodes per second: {result['nodes_per_second']:>9,.0f}  "
+              f"First solution: {format_seconds(result['first_solution_seconds']):>8}  "
+              f"Exhausted: {format_seconds(result['exhaustion_seconds']):>8}  Build memory: {build_memory}  "
+              f"Peak memory: {peak_memory}")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"commit": commit_id(), "python": platform.python_version(), "time_budget": args.time_budget,
+                       "results": results}, output_file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as old_file:
+            regressions = compare(json.load(old_file)["results"], results, args.tolerance)
+        for engine, position, old_speed, new_speed in regressions:
+            print(f"Slower: {engine} {position}  {old_speed:,.0f} -> {new_speed:,.0f} nodes per second")
+        if regressions:
+            raise SystemExit(1)
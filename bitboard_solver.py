@@ -0,0 +1,87 @@
+from tangram import TangramSolver
+
+
+class BitboardSolver(TangramSolver):
+
+    def __init__(self, symmetry_breaking=True, board_mask=None, pieces=None):
+        super().__init__(symmetry_breaking, board_mask, pieces)
+
+        self.full_mask = self.placement_table.full_mask
+
+        self.piece_masks = self.gen_piece_masks(self.piece_positions)
+
+    #####################################################################
+    # Conversion between list boards and bitboards
+    #####################################################################
+    def gen_piece_masks(self, pieces):
+        # per piece, the placements of each orientation indexed by the cell its first filled square lands on
+        piece_masks = []
+        for piece_positions in pieces:
+            piece_val = next(val for val in piece_positions[0][0] if val)
+            piece_masks.append((piece_val, [self.placement_table.anchor_list(position) for position in piece_positions]))
+        return piece_masks
+
+    #####################################################################
+    # Search
+    #####################################################################
+    def iter_masks(self, board, occupied, pieces, placed):
+
+        if self.terminate:
+            return
+
+        self.iterations += 1
+        if self.progress_every and self.iterations % self.progress_every == 0:
+            self.report_progress()
+
+        # win condition is every bit of the board being set
+        if occupied == self.full_mask:
+            solution = self.fill_board(board, placed)
+            if self.is_new_solution(solution):
+                self.solutions_found += 1
+                yield solution
+        else:
+            # lowest clear bit is the first empty square in row-major order
+            cell = ((occupied + 1) & ~occupied).bit_length() - 1
+            square_piece = self.square_piece
+            square_remaining = any(piece_val == square_piece for piece_val, _ in pieces)
+            for i, (piece_val, orientations) in enumerate(pieces):
+                remaining_pieces = None
+                for anchors in orientations:
+                    placement = anchors[cell]
+                    if placement is None or placement.mask & occupied:
+                        continue
+
+                    # placing the square changes the rule for every island, not just the ones it touches
+                    new_occupied = occupied | placement.mask
+                    if piece_val == square_piece:
+                        legal_move = self.island_policy.legal_board(new_occupied, False)
+                    else:
+                        legal_move = self.island_policy.legal_placement(new_occupied, placement.mask, square_remaining)
+                    if not legal_move:
+                        continue
+                    if remaining_pieces is None:
+                        remaining_pieces = pieces[:i] + pieces[i + 1:]
+                    placed.append(placement)
+                    yield from self.iter_masks(board, new_occupied, remaining_pieces, placed)
+                    placed.pop()
+
+    def iter_solutions(self, board, pieces, occupied=None, resume_path=None):
+        if resume_path is not None:
+            raise ValueError("BitboardSolver can't resume from a checkpoint")
+
+        pieces = self.full_orientations(board, pieces)
+        if pieces is self.piece_positions:
+            piece_masks = self.piece_masks
+        else:
+            piece_masks = self.gen_piece_masks(pieces)
+
+        # islands on the starting board are checked once, after that only the ones next to each placement
+        occupied = self.placement_table.board_mask(board)
+        if not self.island_policy.legal_board(occupied, self.square_remaining(pieces)):
+            self.iterations += 1
+            return
+        yield from self.iter_masks(board, occupied, piece_masks, [])
+
+
+if __name__ == "__main__":
+    BitboardSolver().run()
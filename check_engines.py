@@ -0,0 +1,96 @@
+from engines import ENGINES, make_solver
+from benchmark import CORPUS
+import argparse
+
+
+# Positions every engine has to agree on, with the number of distinct solutions each one has. The counts are
+# written out because engines that share a pruning rule can agree with each other and still all be wrong.
+#   name -> (board mask, pieces, starting board, distinct solutions); None means the 8x8 board and tangram set
+CASES = {
+    # the square is still to place next to a 9 square island, which a plain multiple of 5 rule rejects
+    "square_unplaced": (None, None,
+                        [[0, 4, 4, 4, 4, 4, 10, 12],
+                         [0, 11, 11, 11, 10, 10, 10, 12],
+                         [0, 0, 0, 11, 11, 10, 12, 12],
+                         [0, 0, 0, 0, 0, 0, 0, 12],
+                         [0, 13, 0, 0, 0, 0, 0, 0],
+                         [7, 13, 13, 13, 0, 0, 0, 0],
+                         [7, 7, 7, 13, 0, 0, 9, 9],
+                         [7, 0, 0, 0, 0, 9, 9, 9]], 1),
+    "depth_6": (None, None, CORPUS["depth_6"], 1),
+    "depth_9": (None, None, CORPUS["depth_9"], 1),
+    "unsolvable_3a": (None, None, CORPUS["unsolvable_3a"], 0),
+    "unsolvable_3b": (None, None, CORPUS["unsolvable_3b"], 0),
+    "unsolvable_5": (None, None, CORPUS["unsolvable_5"], 0),
+
+    # no piece can break the board's symmetry here, so repeats have to be dropped by canonical board
+    "corner_cut_4x4": ([[0, 1, 1, 1], [1, 1, 1, 1], [1, 1, 1, 1], [1, 1, 1, 0]],
+                       [[[1, 0, 0], [1, 0, 0], [1, 1, 1]], [[1, 0, 0], [1, 0, 0], [1, 1, 1]], [[1, 1], [1, 1]]],
+                       None, 5),
+}
+
+# too many solutions to list quickly, only counted, name -> (starting board, solutions)
+COUNT_CASES = {
+    "depth_3": (CORPUS["depth_3"], 504),
+}
+
+
+def remaining_pieces(solver, board):
+    placed = {val for row in board for val in row if val}
+    return [piece_positions for piece_positions in solver.piece_positions
+            if solver.piece_value(piece_positions) not in placed]
+
+
+def check_case(board_mask, pieces, board, expected):
+    # every engine with and without symmetry breaking, as (engine, symmetry breaking, solutions) for each run
+    # that doesn't find exactly the expected distinct solutions
+    failures = []
+    canonical_sets = []
+    for engine in ENGINES:
+        for symmetry_breaking in (True, False):
+            solver = make_solver(engine, symmetry_breaking=symmetry_breaking, board_mask=board_mask, pieces=pieces)
+            solver.quiet = True
+            start = solver.board if board is None else [[val for val in row] for row in board]
+            solutions = list(solver.iter_solutions(start, remaining_pieces(solver, start)))
+            canonical = {solver.canonical_solution(solution) for solution in solutions}
+            canonical_sets.append(canonical)
+            if len(solutions) != expected or len(canonical) != expected:
+                failures.append((engine, symmetry_breaking, len(solutions)))
+
+    if any(canonical != canonical_sets[0] for canonical in canonical_sets):
+        failures.append(("all", None, "different solutions"))
+    return failures
+
+
+def check_count(board, expected):
+    failures = []
+    for symmetry_breaking in (True, False):
+        solver = make_solver("backtrack", symmetry_breaking=symmetry_breaking)
+        count = solver.count_solutions(board, remaining_pieces(solver, board))
+        if count != expected:
+            failures.append(("count", symmetry_breaking, count))
+    return failures
+
+
+def check_all():
+    # name -> failures for every case
+    results = {}
+    for name, (board_mask, pieces, board, expected) in CASES.items():
+        results[name] = check_case(board_mask, pieces, board, expected)
+    for name, (board, expected) in COUNT_CASES.items():
+        results[name] = check_count(board, expected)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check every engine finds the known solutions of fixed positions")
+    parser.parse_args()
+
+    failed = False
+    for name, failures in check_all().items():
+        print(f"{name:<16} {'ok' if not failures else 'FAILED'}")
+        for engine, symmetry_breaking, found in failures:
+            print(f"    {engine}  Symmetry breaking: {symmetry_breaking}  Found: {found}")
+        failed = failed or bool(failures)
+    if failed:
+        raise SystemExit(1)
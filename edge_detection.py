@@ -1,15 +1,60 @@
+from images import image_paths_in
 import os
+import argparse
 import cv2
 import numpy as np
-from rembg import remove
+from concurrent.futures import ProcessPoolExecutor
+from rembg import remove, new_session
 
-def extract_shape(image_path):
+# inference only ever runs on the CPU
+CPU_PROVIDERS = ["CPUExecutionProvider"]
+
+# one session per process, loading the model is what used to make every call slow
+_session = None
+
+# in fast mode the image is shrunk to this many pixels per grid square before anything else, but never
+# below the 320 pixels the model works at anyway
+PIXELS_PER_SQUARE = 16
+MIN_WORKING_SIZE = 320
+
+
+def make_session(model_name="u2net", model_path=None):
+    # with a model path the weights are read from that file, otherwise rembg looks for model_name under
+    # U2NET_HOME and only downloads it if it isn't there
+    if model_path is not None:
+        return new_session("u2net_custom", model_path=model_path, providers=CPU_PROVIDERS)
+    return new_session(model_name, providers=CPU_PROVIDERS)
+
+
+def get_session(model_name="u2net", model_path=None):
+    global _session
+    if _session is None:
+        _session = make_session(model_name, model_path)
+    return _session
+
+
+def working_scale(image_shape, grid_size):
+    # how far an image can be shrunk before the shape of it on a grid_size grid would change
+    working_size = max(grid_size * PIXELS_PER_SQUARE, MIN_WORKING_SIZE)
+    return min(1.0, working_size / max(image_shape[:2]))
+
+
+def extract_shape(image_path, session=None, grid_size=None):
     # Load the image
     image = cv2.imread(image_path)
+
+    # with a grid size the image only has to keep enough detail for that grid, so shrink it before the
+    # slow steps and shrink the kernel with it
+    scale = 1.0
+    if grid_size is not None:
+        scale = working_scale(image.shape, grid_size)
+        if scale < 1.0:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
     image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
 
     # Remove the background
-    result = remove(image_rgb)
+    result = remove(image_rgb, session=session or get_session())
 
     # Ensure the result has 3 channels
     if result.shape[2] == 4:  # If the result has an alpha channel, remove it
@@ -24,7 +69,8 @@ def extract_shape(image_path):
     _, result = cv2.threshold(result, 1, 255, cv2.THRESH_BINARY)
 
     # Fill in gaps in the white blobs
-    kernel = np.ones((25, 25), np.uint8)
+    kernel_size = max(1, round(25 * scale))
+    kernel = np.ones((kernel_size, kernel_size), np.uint8)
     result = cv2.morphologyEx(result, cv2.MORPH_CLOSE, kernel)
 
     # Ensure the result is in grayscale
@@ -55,4 +101,74 @@ def extract_shape(image_path):
 
     result = cv2.bitwise_not(result)
 
-    return result
\ No newline at end of file
+    return result
+
+
+def init_worker(model_name, model_path):
+    # every worker process loads the model once, up front, and keeps it for all of its images
+    get_session(model_name, model_path)
+
+
+def extract_shape_worker(image_path, grid_size=None):
+    return image_path, extract_shape(image_path, grid_size=grid_size)
+
+
+def extract_shapes(images, workers=1, model_name="u2net", model_path=None, grid_size=None):
+    # yields (image path, shape) for a directory or iterable of images, in order, one session per process
+    image_paths = image_paths_in(images)
+    if workers <= 1:
+        session = get_session(model_name, model_path)
+        for image_path in image_paths:
+            yield image_path, extract_shape(image_path, session, grid_size)
+        return
+
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(model_name, model_path)) as pool:
+        yield from pool.map(extract_shape_worker, image_paths, [grid_size] * len(image_paths))
+
+
+def check_fast_path(images, grid_sizes=(10, 15, 20)):
+    # compare the grids the fast path gives against the full resolution ones, as (image, grid size,
+    # intersection over union of the filled squares, squares that differ)
+    from piece_generator import convert_image_to_coordinates
+
+    results = []
+    for image_path in image_paths_in(images):
+        full_shape = extract_shape(image_path)
+        for grid_size in grid_sizes:
+            full_grid = convert_image_to_coordinates(full_shape, grid_size)
+            fast_grid = convert_image_to_coordinates(extract_shape(image_path, grid_size=grid_size), grid_size)
+            union = full_grid | fast_grid
+            iou = len(full_grid & fast_grid) / len(union) if union else 1.0
+            results.append((image_path, grid_size, iou, len(full_grid ^ fast_grid)))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cut the background out of a batch of images")
+    parser.add_argument("images", nargs="+", help="images, or directories of images, to extract shapes from")
+    parser.add_argument("--output", default="shapes", help="directory to write each shape to as a png")
+    parser.add_argument("--workers", type=int, default=1, help="processes to run the model in")
+    parser.add_argument("--model", default="u2net", help="rembg model to load from U2NET_HOME")
+    parser.add_argument("--model-path", help="onnx file to load the model from instead")
+    parser.add_argument("--grid-size", type=int, help="shrink the images first, keeping enough detail for this grid")
+    parser.add_argument("--check-fast", action="store_true",
+                        help="compare the grids from the shrunk images against full resolution instead")
+    args = parser.parse_args()
+
+    image_paths = []
+    for images in args.images:
+        image_paths.extend(image_paths_in(images) if os.path.isdir(images) else [images])
+
+    if args.check_fast:
+        get_session(args.model, args.model_path)
+        grid_sizes = (args.grid_size,) if args.grid_size else (10, 15, 20)
+        for image_path, grid_size, iou, differing in check_fast_path(image_paths, grid_sizes):
+            print(f"{image_path}  Grid: {grid_size}  IoU: {iou:.3f}  Squares that differ: {differing}")
+        raise SystemExit
+
+    os.makedirs(args.output, exist_ok=True)
+    for image_path, shape in extract_shapes(image_paths, args.workers, args.model, args.model_path,
+                                            args.grid_size):
+        name = os.path.splitext(os.path.basename(image_path))[0]
+        cv2.imwrite(os.path.join(args.output, f"{name}.png"), shape)
+        print(image_path)
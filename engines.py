@@ -0,0 +1,17 @@
+from tangram import TangramSolver
+from bitboard_solver import BitboardSolver
+from exact_cover import ExactCoverSolver
+
+
+# every engine exposes solve_board(board, pieces), run(), iterations and solutions
+ENGINES = {
+    "backtrack": TangramSolver,
+    "bitboard": BitboardSolver,
+    "exact_cover": ExactCoverSolver
+}
+
+
+def make_solver(engine="backtrack", **kwargs):
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown solver engine {engine!r}, expected one of {', '.join(ENGINES)}")
+    return ENGINES[engine](**kwargs)
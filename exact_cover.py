@@ -0,0 +1,116 @@
+from tangram import TangramSolver
+
+
+class ExactCoverSolver(TangramSolver):
+
+    # Algorithm X over an exact cover matrix with a column for every empty square and every remaining piece.
+    # Columns map to the set of rows that fill them and rows map to the columns they fill, so covering and
+    # uncovering a row is a handful of set operations instead of a board copy.
+
+    def build_matrix(self, board, pieces):
+        occupied = self.placement_table.board_mask(board)
+
+        rows = {}
+        for piece_positions in pieces:
+            for position in piece_positions:
+                for placement in self.placement_table.anchor_list(position):
+                    if placement is None or placement.mask & occupied:
+                        continue
+                    rows[len(rows)] = placement
+
+        columns = {}
+        for i, row in enumerate(board):
+            for j, val in enumerate(row):
+                if not occupied >> (i * len(row) + j) & 1:
+                    columns[(i, j)] = set()
+
+        piece_vals = set()
+        piece_area = 0
+        for piece_positions in pieces:
+            piece_squares = [val for row in piece_positions[0] for val in row if val]
+            piece_vals.add(piece_squares[0])
+            piece_area += len(piece_squares)
+            columns[piece_squares[0]] = set()
+
+        row_columns = {}
+        for row_id, placement in rows.items():
+            row_columns[row_id] = list(placement.cells) + [placement.piece]
+            for column in row_columns[row_id]:
+                columns[column].add(row_id)
+
+        # pieces only have to be used when there is exactly enough of them to fill the board
+        if piece_area == len(columns) - len(piece_vals):
+            primary = set(columns)
+        else:
+            primary = set(columns) - piece_vals
+
+        return rows, columns, row_columns, primary
+
+    @staticmethod
+    def select(columns, row_columns, row_id):
+        removed = []
+        for column in row_columns[row_id]:
+            for other_row in columns[column]:
+                for other_column in row_columns[other_row]:
+                    if other_column != column:
+                        columns[other_column].remove(other_row)
+            removed.append(columns.pop(column))
+        return removed
+
+    @staticmethod
+    def deselect(columns, row_columns, row_id, removed):
+        for column in reversed(row_columns[row_id]):
+            columns[column] = removed.pop()
+            for other_row in columns[column]:
+                for other_column in row_columns[other_row]:
+                    if other_column != column:
+                        columns[other_column].add(other_row)
+
+    def search(self, board, rows, columns, row_columns, primary, placed):
+
+        if self.terminate:
+            return
+
+        self.iterations += 1
+        if self.progress_every and self.iterations % self.progress_every == 0:
+            self.report_progress()
+
+        # branch on the square or piece with the fewest ways left to fill it
+        column = None
+        fewest_rows = len(rows) + 1
+        for candidate, candidate_rows in columns.items():
+            if len(candidate_rows) < fewest_rows and candidate in primary:
+                column = candidate
+                fewest_rows = len(candidate_rows)
+                if fewest_rows <= 1:
+                    break
+
+        # win condition is every square being covered
+        if column is None:
+            solution = [[val for val in row] for row in board]
+            for placement in placed:
+                for row, col in placement.cells:
+                    solution[row][col] = placement.piece
+            if self.is_new_solution(solution):
+                self.solutions_found += 1
+                yield solution
+            return
+
+        for row_id in sorted(columns[column]):
+            removed = self.select(columns, row_columns, row_id)
+            placed.append(rows[row_id])
+            yield from self.search(board, rows, columns, row_columns, primary, placed)
+            placed.pop()
+            self.deselect(columns, row_columns, row_id, removed)
+
+    def iter_solutions(self, board, pieces, occupied=None, resume_path=None):
+        if resume_path is not None:
+            raise ValueError("ExactCoverSolver can't resume from a checkpoint")
+
+        pieces = self.full_orientations(board, pieces)
+        rows, columns, row_columns, primary = self.build_matrix(board, pieces)
+        yield from self.search(board, rows, columns, row_columns, primary, [])
+
+
+if __name__ == "__main__":
+    ExactCoverSolver().run()
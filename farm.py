@@ -0,0 +1,157 @@
+from pipeline import PuzzlePipeline, content_hash
+from images import image_paths_in
+from generator import check_candidate
+from puzzle import puzzle_from_pieces
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import json
+import os
+import time
+
+
+# The manifest is JSON lines, one puzzle per line:
+#   {"image": "images/image4.jpg", "image_hash": "...", "seed": 0, "grid_size": 12,
+#    "pieces": [4128, 917504, ...], "solutions": 1, "exhausted": true, "out_of_nodes": false}
+# where each piece is a mask over the grid with bit row * grid_size + col set for every square it covers.
+# solutions is how many distinct solutions the solver found before stopping, exact when exhausted is true.
+# Otherwise out_of_nodes tells whether it stopped at the node budget or at more than max_solutions.
+
+
+def image_hash(image_path):
+    with open(image_path, "rb") as image_file:
+        return content_hash("image", image_file.read())
+
+
+def piece_mask(piece, grid_size):
+    mask = 0
+    for row, col in piece:
+        mask |= 1 << (row * grid_size + col)
+    return mask
+
+
+def read_manifest(path):
+    # (image hash, seed, grid size) of every puzzle already made, a cut off last line is left for redoing
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as manifest:
+        for line in manifest:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            done.add((entry["image_hash"], entry["seed"], entry["grid_size"]))
+    return done
+
+
+def prepare_image(image_path, grid_sizes, mask_grid_size=None, cache_dir="stored_objects/pipeline"):
+    # cuts the background out once and returns grid size -> (grid key, shape) for every grid it's needed on
+    pipeline = PuzzlePipeline(cache_dir)
+    mask_key, mask = pipeline.mask(image_path, mask_grid_size)
+    return {grid_size: pipeline.grid(mask_key, mask, grid_size) for grid_size in grid_sizes}
+
+
+def farm_puzzle(image_path, hashed, grid_size, grid_key, shape, seed, cache_dir="stored_objects/pipeline",
+                max_piece_size=5, min_piece_size=3, max_nodes=100_000, max_solutions=10):
+    pipeline = PuzzlePipeline(cache_dir)
+    _, pieces = pipeline.pieces(grid_key, shape, max_piece_size, min_piece_size, seed)
+    board_mask, piece_grids = puzzle_from_pieces(pieces)
+    candidate = {"board": board_mask, "piece_grids": piece_grids}
+    solutions, exhausted, out_of_nodes, _ = check_candidate(candidate, max_nodes, max_solutions)
+    return {
+        "image": image_path,
+        "image_hash": hashed,
+        "seed": seed,
+        "grid_size": grid_size,
+        "pieces": sorted(piece_mask(piece, grid_size) for piece in pieces),
+        "solutions": solutions,
+        "exhausted": exhausted,
+        "out_of_nodes": out_of_nodes,
+    }
+
+
+def farm(images, seeds, grid_sizes, manifest_path="puzzles/manifest.jsonl", workers=1,
+         cache_dir="stored_objects/pipeline", max_piece_size=5, min_piece_size=3, max_nodes=100_000,
+         max_solutions=10, fast=False):
+    # Makes every puzzle the manifest doesn't have yet, appending each one as soon as it's done. Each image's
+    # shapes are made first, one image per job, then every (image, grid size, seed) puzzle is its own job so
+    # the pool keeps busy however few images there are.
+
+    done = read_manifest(manifest_path)
+    pending = []
+    for image_path in image_paths_in(images):
+        hashed = image_hash(image_path)
+        jobs = [(grid_size, seed) for grid_size in grid_sizes for seed in seeds
+                if (hashed, seed, grid_size) not in done]
+        if jobs:
+            pending.append((image_path, hashed, jobs))
+
+    # in fast mode the mask is always made for the largest grid asked for, so a restart cuts the same shapes
+    mask_grid_size = max(grid_sizes) if fast else None
+    puzzle_options = {"cache_dir": cache_dir, "max_piece_size": max_piece_size, "min_piece_size": min_piece_size,
+                      "max_nodes": max_nodes, "max_solutions": max_solutions}
+
+    os.makedirs(os.path.dirname(manifest_path) or ".", exist_ok=True)
+    with open(manifest_path, "a+") as manifest:
+        # a run that was killed part way through a line leaves it unfinished, the next entry starts a new one
+        if manifest.tell():
+            manifest.seek(manifest.tell() - 1)
+            if manifest.read(1) != "\n":
+                manifest.write("\n")
+
+        def write(entry):
+            manifest.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            manifest.flush()
+            return entry
+
+        if workers <= 1:
+            for image_path, hashed, jobs in pending:
+                shapes = prepare_image(image_path, sorted({grid_size for grid_size, _ in jobs}), mask_grid_size,
+                                       cache_dir)
+                for grid_size, seed in jobs:
+                    yield write(farm_puzzle(image_path, hashed, grid_size, *shapes[grid_size], seed,
+                                            **puzzle_options))
+            return
+
+        with ProcessPoolExecutor(workers) as pool:
+            image_shapes = [pool.submit(prepare_image, image_path, sorted({grid_size for grid_size, _ in jobs}),
+                                        mask_grid_size, cache_dir)
+                            for image_path, _, jobs in pending]
+
+            futures = []
+            for (image_path, hashed, jobs), shapes in zip(pending, image_shapes):
+                shapes = shapes.result()
+                for grid_size, seed in jobs:
+                    futures.append(pool.submit(farm_puzzle, image_path, hashed, grid_size, *shapes[grid_size], seed,
+                                               **puzzle_options))
+            for future in as_completed(futures):
+                yield write(future.result())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Make puzzles from every image in a directory for every seed and "
+                                                 "grid size, recording them in a manifest")
+    parser.add_argument("images", help="directory of images to make puzzles from")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0], help="seeds to split each shape with")
+    parser.add_argument("--grid-sizes", type=int, nargs="+", default=[10], help="grid sizes to make puzzles on")
+    parser.add_argument("--manifest", default="puzzles/manifest.jsonl", help="manifest to append puzzles to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes to make puzzles in")
+    parser.add_argument("--max-piece-size", type=int, default=5, help="most squares in a piece")
+    parser.add_argument("--min-piece-size", type=int, default=3, help="fewest squares in a piece")
+    parser.add_argument("--max-nodes", type=int, default=100_000, help="boards to search when counting solutions")
+    parser.add_argument("--max-solutions", type=int, default=10, help="stop counting solutions past this many")
+    parser.add_argument("--fast", action="store_true", help="shrink each image to what the largest grid needs first")
+    parser.add_argument("--cache", default="stored_objects/pipeline", help="directory to cache each stage in")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    made = 0
+    for entry in farm(args.images, args.seeds, args.grid_sizes, args.manifest, args.workers, args.cache,
+                      args.max_piece_size, args.min_piece_size, args.max_nodes, args.max_solutions, args.fast):
+        made += 1
+        solutions = entry["solutions"]
+        if not entry["exhausted"]:
+            solutions = f">={solutions} (out of nodes)" if entry["out_of_nodes"] else f">{args.max_solutions}"
+        print(f"{entry['image']}  Grid: {entry['grid_size']}  Seed: {entry['seed']}  "
+              f"Pieces: {len(entry['pieces'])}  Solutions: {solutions}")
+    print(f"Puzzles: {made}  Elapsed: {time.perf_counter() - start:.2f}s")
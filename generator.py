@@ -0,0 +1,150 @@
+from tangram import TangramSolver
+from partition import partition_shape
+from pipeline import PuzzlePipeline
+from puzzle import puzzle_from_pieces, save_puzzle
+from symmetry import canonical_board, grid_key
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+import time
+
+
+class BudgetSolver(TangramSolver):
+
+    # Counts the distinct solutions of a puzzle, giving up after max_nodes boards or once there are more than
+    # max_solutions of them. Solutions are told apart up to the board's symmetries and up to swapping pieces
+    # of the same shape, so a puzzle with two identical pieces still counts as having one solution.
+
+    def __init__(self, board_mask, pieces, max_nodes=100_000, max_solutions=1):
+        if max_nodes <= 0:
+            raise ValueError(f"max_nodes has to be positive, not {max_nodes}")
+
+        super().__init__(board_mask=board_mask, pieces=pieces)
+        self.quiet = True
+        self.max_solutions = max_solutions
+
+        # the progress hook every engine calls is the budget check, called once max_nodes boards are searched
+        self.max_nodes = max_nodes
+        self.progress_every = max_nodes
+        self.out_of_nodes = False
+
+        # pieces of the same shape get the same label before solutions are compared
+        self.shape_labels = {}
+        shape_classes = {}
+        for piece_positions in self.piece_positions:
+            shape = min(grid_key(self.number_piece(position, 1)) for position in self.get_all_positions(
+                piece_positions[0]))
+            self.shape_labels[self.piece_value(piece_positions)] = shape_classes.setdefault(shape,
+                                                                                            len(shape_classes) + 1)
+        self.distinct = set()
+
+    def report_progress(self):
+        if self.iterations >= self.max_nodes:
+            self.out_of_nodes = True
+            self.terminate = True
+
+    def add_solution(self, board):
+        labelled = [[self.shape_labels.get(val, 0) for val in row] for row in board]
+        self.distinct.add(canonical_board(labelled, self.symmetries))
+        if len(self.distinct) > self.max_solutions:
+            self.terminate = True
+
+    def count(self):
+        # the distinct solutions found, whether that's all of them, and whether the search ran out of nodes
+        # rather than stopping at too many solutions
+        self.solve_board(self.board, self.piece_positions)
+        return len(self.distinct), not self.terminate, self.out_of_nodes
+
+
+def make_candidate(shape, grid_size, max_piece_size, min_piece_size, seed):
+    pieces = partition_shape(shape, max_piece_size, min_piece_size, seed)
+    board_mask, piece_grids = puzzle_from_pieces(pieces)
+    return {"seed": seed, "grid_size": grid_size, "pieces": [sorted(piece) for piece in pieces],
+            "board": board_mask, "piece_grids": piece_grids}
+
+
+def check_candidate(candidate, max_nodes=100_000, max_solutions=1):
+    # the number of distinct solutions, whether the search finished, whether it ran out of nodes, and how many
+    # boards it took
+    solver = BudgetSolver(candidate["board"], candidate["piece_grids"], max_nodes, max_solutions)
+    solutions, exhausted, out_of_nodes = solver.count()
+    return solutions, exhausted, out_of_nodes, solver.iterations
+
+
+def check_candidate_worker(args):
+    candidate, max_nodes, max_solutions = args
+    return candidate, check_candidate(candidate, max_nodes, max_solutions)
+
+
+def generate_puzzles(shape, grid_size, puzzles=10, min_solutions=1, max_solutions=1, max_nodes=100_000,
+                     max_piece_size=5, min_piece_size=3, max_pieces=12, first_seed=0, max_candidates=10_000,
+                     workers=1):
+    # Yields (candidate, solutions, nodes) for the first puzzles candidates, in seed order, whose solution
+    # count is known to be within [min_solutions, max_solutions]. Candidates with too many pieces are
+    # dropped before solving, and ones that run out of nodes count as rejected.
+    found = 0
+    batch_size = max(1, workers) * 4
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        for batch_start in range(first_seed, first_seed + max_candidates, batch_size):
+            batch = []
+            for seed in range(batch_start, min(batch_start + batch_size, first_seed + max_candidates)):
+                candidate = make_candidate(shape, grid_size, max_piece_size, min_piece_size, seed)
+                if len(candidate["pieces"]) <= max_pieces:
+                    batch.append((candidate, max_nodes, max_solutions))
+
+            results = pool.map(check_candidate_worker, batch) if pool else map(check_candidate_worker, batch)
+            for candidate, (solutions, exhausted, _, nodes) in results:
+                if exhausted and min_solutions <= solutions <= max_solutions:
+                    yield candidate, solutions, nodes
+                    found += 1
+                    if found >= puzzles:
+                        return
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate puzzles from an image, keeping only ones the solver "
+                                                 "has checked")
+    parser.add_argument("image", help="image to make puzzles from")
+    parser.add_argument("--grid-size", type=int, default=20, help="largest grid to try")
+    parser.add_argument("--puzzles", type=int, default=10, help="how many puzzles to generate")
+    parser.add_argument("--min-solutions", type=int, default=1, help="fewest distinct solutions to accept")
+    parser.add_argument("--max-solutions", type=int, default=1, help="most distinct solutions to accept")
+    parser.add_argument("--max-nodes", type=int, default=100_000, help="boards to search per candidate")
+    parser.add_argument("--max-piece-size", type=int, default=5, help="most squares in a piece")
+    parser.add_argument("--min-piece-size", type=int, default=3, help="fewest squares in a piece")
+    parser.add_argument("--max-pieces", type=int, default=12, help="shrink the grid until there are this few pieces")
+    parser.add_argument("--seed", type=int, default=0, help="first seed to split the shape with")
+    parser.add_argument("--max-candidates", type=int, default=10_000, help="seeds to try before giving up")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes to check candidates in")
+    parser.add_argument("--fast", action="store_true", help="shrink the image to what the grid needs first")
+    parser.add_argument("--cache", default="stored_objects/pipeline", help="directory to cache each stage in")
+    parser.add_argument("--output", default="puzzles", help="directory to write each puzzle file to")
+    args = parser.parse_args()
+
+    # the pipeline settles the grid size with the first seed, every candidate is then cut from that grid
+    pipeline = PuzzlePipeline(args.cache)
+    grid_size, _, _, _ = pipeline.run(args.image, args.grid_size, args.max_piece_size, args.min_piece_size,
+                                      args.max_pieces, args.seed, args.fast)
+    mask_key, mask = pipeline.mask(args.image, args.grid_size if args.fast else None)
+    _, shape = pipeline.grid(mask_key, mask, grid_size)
+
+    os.makedirs(args.output, exist_ok=True)
+    name = os.path.splitext(os.path.basename(args.image))[0]
+    start = time.perf_counter()
+    generated = 0
+    for candidate, solutions, nodes in generate_puzzles(shape, grid_size, args.puzzles, args.min_solutions,
+                                                        args.max_solutions, args.max_nodes, args.max_piece_size,
+                                                        args.min_piece_size, args.max_pieces, args.seed,
+                                                        args.max_candidates, args.workers):
+        generated += 1
+        save_puzzle(os.path.join(args.output, f"{name}-{grid_size}-{candidate['seed']}.json"),
+                    candidate["board"], candidate["piece_grids"])
+        print(f"Seed: {candidate['seed']}  Pieces: {len(candidate['pieces'])}  Solutions: {solutions}  "
+              f"Nodes: {nodes:,}")
+
+    elapsed = time.perf_counter() - start
+    print(f"Puzzles: {generated}  Elapsed: {elapsed:.2f}s  Puzzles per hour: {generated * 3600 / max(elapsed, 1e-9):,.0f}")
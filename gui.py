@@ -1,21 +1,101 @@
 from tangram import TangramSolver
+from placements import Placement
+from pruning import IslandPolicy
+from solution_index import SolutionIndex
+from symmetry import grid_key
 from setup import *
+import os
+import queue
 import sys
+import threading
+import time
 
 
-class TangramGame(TangramSolver):
+class BackgroundSolver(TangramSolver):
 
-    def __init__(self):
+    # Searches on a thread of its own and reports back through a queue:
+    #   ("progress", iterations, iterations per second, depth)
+    #   ("solution", board)
+    #   ("done", iterations, whether the search ran to the end rather than being cancelled)
 
-        super().__init__()
+    def __init__(self, island_policy, search_queue, progress_every=1_000, board_mask=None, pieces=None):
+        super().__init__(board_mask=board_mask, pieces=pieces)
+        self.island_policy = island_policy
+        self.search_queue = search_queue
+        self.quiet = True
+        self.progress_every = progress_every
 
-        self.solution = []
+    def report_progress(self):
+        elapsed = time.perf_counter() - self.start_time
+        self.search_queue.put(("progress", self.iterations, self.iterations / max(elapsed, 1e-9), len(self.path)))
+
+    def add_solution(self, board):
+        # one solution is all the game needs
+        self.terminate = True
+        self.search_queue.put(("solution", board))
+
+    def solve(self, board, pieces):
+        self.iterations = 0
+        self.solutions_found = 0
+        self.start_time = time.perf_counter()
+        self.solve_board(board, pieces)
+        self.search_queue.put(("done", self.iterations, self.solutions_found > 0 or not self.terminate))
 
-        self.board_buffer = [[0, 0, 0, 0, 0, 0, 0, 0].copy() for _ in range(8)]
 
-        self.unused_pieces = [num for num in range(1, 14)]
+class TangramGame(TangramSolver):
+
+    def __init__(self, fps=FPS, board_mask=None, pieces=None):
+
+        super().__init__(board_mask=board_mask, pieces=pieces)
 
-        self.current_piece = self.pieces[random.choice(self.unused_pieces)]
+        # the square can be anywhere on a player's board, so only rule out islands no set of pieces can fill
+        if self.standard_pieces:
+            self.island_policy = IslandPolicy(len(self.board), len(self.board[0]), mod_five=False, small_islands=True)
+
+        self.solution = []
+
+        # the stored solutions are only for the tangram pieces on the 8x8 board
+        self.solution_index = None
+        if self.standard_pieces and board_mask is None and os.path.exists(SOLUTION_INDEX_PATH):
+            self.solution_index = SolutionIndex.load(SOLUTION_INDEX_PATH)
+
+        # placement of the piece the last hint pointed at
+        self.hint = None
+
+        # solver for the S and H keys when there's no index to answer from
+        self.search_queue = queue.Queue()
+        self.background_solver = BackgroundSolver(self.island_policy, self.search_queue, board_mask=board_mask,
+                                                  pieces=pieces)
+        self.search_thread = None
+        self.search_show = "solution"
+        self.search_rate = 0
+        self.search_depth = 0
+
+        # piece -> placement of every piece on the board and the squares they take, kept up to date as pieces
+        # are placed and erased so nothing has to scan the whole board
+        self.placed = {}
+        self.occupied = self.placement_table.blocked
+
+        # placement of the current piece under the mouse, None when it doesn't fit there
+        self.preview = None
+
+        # squares that changed since the last frame, marked as pieces, the preview and the hint come and go
+        self.dirty = set()
+
+        # bigger boards are shrunk to fit where the 8x8 board goes, and squares outside the board's shape are
+        # filled in
+        board_height, board_width = len(self.board), len(self.board[0])
+        self.square_size = min(SQUARE_WIDTH, SQUARE_HEIGHT, BOARD_WIDTH // board_width, BOARD_HEIGHT // board_height)
+        self.board_x = BOARD_X_OFFSET + (BOARD_WIDTH - board_width * self.square_size) // 2
+        self.board_y = BOARD_Y_OFFSET
+        self.blocked_cells = [(row, col) for row in range(board_height) for col in range(board_width)
+                              if self.placement_table.blocked >> (row * board_width + col) & 1]
+
+        self.unused_pieces = [num for num in range(1, len(self.pieces))]
+
+        self.current_piece = None
+        self.current_key = None
+        self.set_current_piece(self.pieces[random.choice(self.unused_pieces)])
 
         self.piece_idx_pointer = 0
 
@@ -24,262 +104,393 @@ class TangramGame(TangramSolver):
         self.draw_buffer_event = pg.USEREVENT + 1
         pg.time.set_timer(self.draw_buffer_event, 100)
 
+        # the background only has to be scaled once, and text only rendered once per string
+        self.background = pg.transform.scale(BACKGROUND, (SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        self.text_cache = {}
+
+        # what is on the screen right now, so a frame only redraws what changed since the last one
+        self.drawn_state = None
+        self.drawn_panel = None
+        panel_top = self.board_y + board_height * self.square_size + LINE_THICKNESS
+        self.panel_rect = pg.Rect(0, panel_top, SCREEN_WIDTH, SCREEN_HEIGHT - panel_top)
+
+        self.fps = fps
+        self.clock = pg.time.Clock()
+
     #####################################################################
     # Methods for drawing to the screen
     #####################################################################
     def draw_board_outline(self):
+        board_left = self.board_x
+        board_right = self.board_x + len(self.board[0]) * self.square_size
+        board_top = self.board_y
+        board_bottom = self.board_y + len(self.board) * self.square_size
+
         # left
-        pg.draw.line(SCREEN, (0, 0, 0),
-                     (BOARD_X_OFFSET, BOARD_Y_OFFSET),
-                     (BOARD_X_OFFSET, BOARD_Y_OFFSET + len(self.board) * SQUARE_HEIGHT),
-                     LINE_THICKNESS)
+        left = pg.draw.line(SCREEN, (0, 0, 0), (board_left, board_top), (board_left, board_bottom), LINE_THICKNESS)
 
         # right
-        pg.draw.line(SCREEN, (0, 0, 0),
-                     (BOARD_X_OFFSET + len(self.board[0]) * SQUARE_WIDTH, BOARD_Y_OFFSET),
-                     (BOARD_X_OFFSET + len(self.board[0]) * SQUARE_WIDTH, BOARD_Y_OFFSET + len(self.board) * SQUARE_HEIGHT),
-                     LINE_THICKNESS)
+        right = pg.draw.line(SCREEN, (0, 0, 0), (board_right, board_top), (board_right, board_bottom), LINE_THICKNESS)
 
         # top
-        pg.draw.line(SCREEN, (0, 0, 0),
-                     (BOARD_X_OFFSET, BOARD_Y_OFFSET),
-                     (BOARD_X_OFFSET + len(self.board[0]) * SQUARE_WIDTH, BOARD_Y_OFFSET),
-                     LINE_THICKNESS)
+        top = pg.draw.line(SCREEN, (0, 0, 0), (board_left, board_top), (board_right, board_top), LINE_THICKNESS)
 
         # bottom
-        pg.draw.line(SCREEN, (0, 0, 0),
-                     (BOARD_X_OFFSET, BOARD_Y_OFFSET + len(self.board) * SQUARE_HEIGHT),
-                     (BOARD_X_OFFSET + len(self.board[0]) * SQUARE_WIDTH, BOARD_Y_OFFSET + len(self.board) * SQUARE_HEIGHT),
-                     LINE_THICKNESS)
+        bottom = pg.draw.line(SCREEN, (0, 0, 0), (board_left, board_bottom), (board_right, board_bottom),
+                              LINE_THICKNESS)
 
-    @staticmethod
-    def draw_title():
-        title_word = TITLE_FONT.render("TANGRAMS", True, (0, 0, 0))
-        title_rect = title_word.get_rect()
-        title_rect.center = (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 10.2)
-        SCREEN.blit(title_word, title_rect)
+        return [left, right, top, bottom]
+
+    def square_rect(self, row, col):
+        return pg.Rect(self.board_x + col * self.square_size, self.board_y + row * self.square_size,
+                       self.square_size, self.square_size)
+
+    def mouse_square(self):
+        # (row, col) of the board square under the mouse, None when it's off the board
+        mouse_x, mouse_y = pg.mouse.get_pos()
+        row = (mouse_y - self.board_y) // self.square_size
+        col = (mouse_x - self.board_x) // self.square_size
+        if (0 <= row < len(self.board)) and (0 <= col < len(self.board[0])):
+            return row, col
+        return None
+
+    def draw_blocked_squares(self):
+        for row, col in self.blocked_cells:
+            pg.draw.rect(SCREEN, BLOCKED_COLOR, self.square_rect(row, col))
+
+    def render_text(self, font, text):
+        key = (font, text)
+        if key not in self.text_cache:
+            # counters change every frame while solving, so don't let their old values pile up
+            if len(self.text_cache) > 256:
+                self.text_cache.clear()
+            self.text_cache[key] = font.render(text, True, (0, 0, 0))
+        return self.text_cache[key]
+
+    def blit_text(self, font, text, center):
+        text_surface = self.render_text(font, text)
+        text_rect = text_surface.get_rect()
+        text_rect.center = center
+        SCREEN.blit(text_surface, text_rect)
+
+    def draw_title(self):
+        self.blit_text(TITLE_FONT, "TANGRAMS", (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 10.2))
 
     @staticmethod
-    def draw_piece(piece_coords, board, x_offset, y_offset):
+    def piece_color(piece_val):
+        # bigger piece sets reuse the colours
+        return COLOR_MAP[(piece_val - 1) % (len(COLOR_MAP) - 1) + 1]
+
+    def draw_piece(self, piece_coords, board, x_offset, y_offset, square_width=SQUARE_WIDTH,
+                   square_height=SQUARE_HEIGHT):
         for row, col in piece_coords:
             if board[row][col]:
-                pg.draw.rect(SCREEN, COLOR_MAP[board[row][col]], [SQUARE_WIDTH * col + x_offset,
-                                                                  SQUARE_HEIGHT * row + y_offset,
-                                                                  SQUARE_WIDTH,
-                                                                  SQUARE_HEIGHT])
+                pg.draw.rect(SCREEN, self.piece_color(board[row][col]), [square_width * col + x_offset,
+                                                                         square_height * row + y_offset,
+                                                                         square_width,
+                                                                         square_height])
 
     def draw_buffer(self):
-        self.board_buffer = [[0, 0, 0, 0, 0, 0, 0, 0].copy() for _ in range(8)]
-        mouse_x, mouse_y = pg.mouse.get_pos()
-        row = (mouse_y - BOARD_Y_OFFSET) // SQUARE_HEIGHT
-        col = (mouse_x - BOARD_X_OFFSET) // SQUARE_WIDTH
-        if (0 <= row < len(self.board)) and (0 <= col < len(self.board[0])):
-            legal_moves = self.get_legal_squares(self.board, self.current_piece, False)
-
-            if (row, col) in legal_moves:
-                self.board_buffer, _ = self.add_piece(self.board_buffer, self.current_piece, row, col, False)
+        # one lookup for the hovered square and one mask test, whatever the size of the board
+        preview = None
+        square = self.mouse_square()
+        if square is not None:
+            row, col = square
+            placement = self.placement_table.by_origin.get((self.current_key, row, col))
+            if placement is not None and not placement.mask & self.occupied:
+                preview = placement
+        self.set_preview(preview)
 
     def draw_board_pieces(self, board, x_offset, y_offset):
         piece_positions = self.get_piece_positions(board)
         for piece_coord in piece_positions.values():
             self.draw_piece(piece_coord, board, x_offset, y_offset)
 
-    @staticmethod
-    def draw_fail_state():
-        SCREEN.blit(pg.transform.scale(BACKGROUND, (SCREEN_WIDTH, SCREEN_HEIGHT)), (0, 0))
-        num_iterations_text = NUM_ITERATIONS_FONT.render(f"No Solutions Found!", True, (0, 0, 0))
-        num_iterations_rect = num_iterations_text.get_rect()
-        num_iterations_rect.center = (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2)
-        SCREEN.blit(num_iterations_text, num_iterations_rect)
+    def draw_fail_state(self):
+        SCREEN.blit(self.background, (0, 0))
+        self.blit_text(NUM_ITERATIONS_FONT, "No Solutions Found!", (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2))
         pg.display.update()
 
     def draw_start_state(self):
-        SCREEN.blit(pg.transform.scale(BACKGROUND, (SCREEN_WIDTH, SCREEN_HEIGHT)), (0, 0))
+        SCREEN.blit(self.background, (0, 0))
         self.draw_title()
-        instructions_text = NUM_ITERATIONS_FONT.render(f"Cycle through pieces with left", True, (0, 0, 0))
-        instructions_rect = instructions_text.get_rect()
-        instructions_rect.center = (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 3)
-        SCREEN.blit(instructions_text, instructions_rect)
-
-        instructions_text2 = NUM_ITERATIONS_FONT.render(f"and right arrow keys", True, (0, 0, 0))
-        instructions_rect2 = instructions_text2.get_rect()
-        instructions_rect2.center = (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 3 + 75)
-        SCREEN.blit(instructions_text2, instructions_rect2)
-
-        instructions_text3 = NUM_ITERATIONS_FONT.render(f"Rotate and flip with R and F", True, (0, 0, 0))
-        instructions_rect3 = instructions_text3.get_rect()
-        instructions_rect3.center = (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 3 + 150)
-        SCREEN.blit(instructions_text3, instructions_rect3)
-
-        instructions_text4 = NUM_ITERATIONS_FONT.render(f"Solve the puzzle with S", True, (0, 0, 0))
-        instructions_rect4 = instructions_text4.get_rect()
-        instructions_rect4.center = (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 3 + 225)
-        SCREEN.blit(instructions_text4, instructions_rect4)
-
+        instructions = ("Cycle through pieces with left",
+                        "and right arrow keys",
+                        "Rotate and flip with R and F",
+                        "Solve the puzzle with S",
+                        "Get a hint with H")
+        for i, instruction in enumerate(instructions):
+            self.blit_text(NUM_ITERATIONS_FONT, instruction, (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 3 + 75 * i))
         pg.display.update()
 
     def draw_text(self):
         if self.unused_pieces:
-            current_piece_text = NUM_ITERATIONS_FONT.render("Current Piece: ", True, (0, 0, 0))
-            current_piece_rect = current_piece_text.get_rect()
-            current_piece_rect.center = (SCREEN_WIDTH / 3, SCREEN_HEIGHT / 1.25)
-            SCREEN.blit(current_piece_text, current_piece_rect)
+            self.blit_text(NUM_ITERATIONS_FONT, "Current Piece: ", (SCREEN_WIDTH / 3, SCREEN_HEIGHT / 1.25))
 
         # draw number of iterations if puzzle is solved
         else:
-            num_iterations_text = NUM_ITERATIONS_FONT.render(f"Board Positions Searched: {self.iterations:,}", True,
-                                                             (0, 0, 0))
-            num_iterations_rect = num_iterations_text.get_rect()
-            num_iterations_rect.center = (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 1.3)
-            SCREEN.blit(num_iterations_text, num_iterations_rect)
+            self.blit_text(NUM_ITERATIONS_FONT, f"Board Positions Searched: {self.iterations:,}",
+                           (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 1.3))
+
+    def draw_search_progress(self):
+        self.blit_text(NUM_ITERATIONS_FONT, f"Board Positions Searched: {self.iterations:,}",
+                       (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 1.3))
+        self.blit_text(CURRENT_PIECE_FONT, f"{self.search_rate:,.0f} per second  Depth: {self.search_depth}  "
+                                           f"Esc to stop", (SCREEN_WIDTH / 2, SCREEN_HEIGHT / 1.3 + 60))
+
+    def square_piece_val(self, row, col):
+        # what the square shows, the placement preview over the hint over the pieces already down
+        for placement in (self.preview, self.hint):
+            if placement is not None and (row, col) in placement.cells:
+                return placement.piece
+        return self.board[row][col]
+
+    def draw_changed_squares(self):
+        dirty_rects = []
+        for row, col in self.dirty:
+            square = self.square_rect(row, col)
+            SCREEN.blit(self.background, square, square)
+            piece_val = self.square_piece_val(row, col)
+            if piece_val:
+                pg.draw.rect(SCREEN, self.piece_color(piece_val), square)
+            dirty_rects.append(square)
+        self.dirty.clear()
+
+        # squares along the edge are drawn over half of the outline
+        if dirty_rects:
+            dirty_rects.extend(self.draw_board_outline())
+        return dirty_rects
+
+    def draw_changed_panel(self):
+        # everything under the board, the current piece and the text about the search
+        panel = (self.game_state, grid_key(self.current_piece), bool(self.unused_pieces), self.iterations,
+                 round(self.search_rate), self.search_depth)
+        if panel == self.drawn_panel:
+            return []
+        self.drawn_panel = panel
+
+        SCREEN.blit(self.background, self.panel_rect, self.panel_rect)
+        if self.game_state == "solving":
+            self.draw_search_progress()
+        else:
+            self.draw_text()
+            self.draw_board_pieces(self.current_piece, CURR_PIECE_X_OFFSET, CURR_PIECE_Y_OFFSET)
+        return [self.panel_rect]
+
+    def draw_play_state(self):
+        # a new state redraws the whole screen, after that only the squares and text that change
+        if self.drawn_state != self.game_state:
+            self.drawn_state = self.game_state
+            for placement in (*self.placed.values(), self.hint, self.preview):
+                self.mark_dirty(placement)
+            self.drawn_panel = None
+            SCREEN.blit(self.background, (0, 0))
+            self.draw_title()
+            self.draw_blocked_squares()
+            self.draw_changed_squares()
+            self.draw_board_outline()
+            self.draw_changed_panel()
+            pg.display.update()
+            return
+
+        dirty_rects = self.draw_changed_squares() + self.draw_changed_panel()
+        if dirty_rects:
+            pg.display.update(dirty_rects)
 
     #####################################################################
     # Methods that access or modify the board state
     #####################################################################
     @staticmethod
     def get_piece_positions(board):
-        piece_loc_dict = {num: [] for num in range(1, 14)}
+        piece_loc_dict = {}
         for i, row in enumerate(board):
             for j, val in enumerate(row):
                 if val:
-                    piece_loc_dict[val].append((i, j))
+                    piece_loc_dict.setdefault(val, []).append((i, j))
         return piece_loc_dict
 
-    @staticmethod
-    def clear_piece(piece_val, board):
-        for i, row in enumerate(board):
-            for j, val in enumerate(row):
-                if val == piece_val:
-                    board[i][j] = 0
+    def mark_dirty(self, placement):
+        if placement is not None:
+            self.dirty.update(placement.cells)
+
+    def set_preview(self, placement):
+        if placement is not self.preview:
+            self.mark_dirty(self.preview)
+            self.mark_dirty(placement)
+            self.preview = placement
+
+    def set_hint(self, placement):
+        if placement is not self.hint:
+            self.mark_dirty(self.hint)
+            self.mark_dirty(placement)
+            self.hint = placement
+
+    def add_placement(self, placement):
+        for row, col in placement.cells:
+            self.board[row][col] = placement.piece
+        self.placed[placement.piece] = placement
+        self.occupied |= placement.mask
+        self.mark_dirty(placement)
+
+    def remove_placement(self, piece_val):
+        placement = self.placed.pop(piece_val)
+        for row, col in placement.cells:
+            self.board[row][col] = 0
+        self.occupied &= ~placement.mask
+        self.mark_dirty(placement)
+
+    def index_board(self, board):
+        # rebuild the index for a board that was filled in all at once
+        for placement in self.placed.values():
+            self.mark_dirty(placement)
+        self.placed = {}
+        self.occupied = self.placement_table.blocked
+        for val, cells in self.get_piece_positions(board).items():
+            if cells:
+                self.placed[val] = self.cells_placement(val, cells)
+                self.occupied |= self.placed[val].mask
+                self.mark_dirty(self.placed[val])
+
+    def cells_placement(self, piece_val, cells):
+        mask = 0
+        for row, col in cells:
+            mask |= 1 << (row * len(self.board[0]) + col)
+        return Placement(piece_val, min(row for row, _ in cells), min(col for _, col in cells), tuple(cells), mask)
+
+    def solved(self):
+        return self.occupied == self.placement_table.full_mask
+
+    def set_current_piece(self, piece):
+        # the key is what the hover preview looks placements up by, so it only changes with the piece
+        self.current_piece = piece
+        self.current_key = self.placement_table.position_key(piece)
+        self.placement_table.add_position(piece)
+        self.draw_buffer()
 
     def add_erase_piece(self, row, col):
+        self.set_hint(None)
         val = self.board[row][col]
-        self.board, legal = self.add_piece(self.board, self.current_piece, row, col, check_islands=False)
+        placement = self.placement_table.by_origin.get((self.current_key, row, col))
+        legal = placement is not None and not placement.mask & self.occupied
 
         # erase tile unless you're trying to place a piece next to it
         if val and not legal:
-            self.clear_piece(val, self.board)
+            self.remove_placement(val)
             self.unused_pieces.append(val)
 
+            # the board was full, so there was no current piece until now
+            if len(self.unused_pieces) == 1:
+                self.set_current_piece(self.pieces[val])
+
         # place piece if any remain and the move is legal
         elif self.unused_pieces and legal:
-            to_remove = None
-            for row in self.current_piece:
-                for val in row:
-                    if val:
-                        to_remove = val
-                        break
-            self.unused_pieces.remove(to_remove)
-            if not self.unused_pieces:
+            self.add_placement(placement)
+            self.unused_pieces.remove(placement.piece)
+            if self.solved():
                 self.solution = self.board
-                self.current_piece = [[]]
+                self.set_current_piece([[]])
             else:
-                self.current_piece = self.pieces[self.unused_pieces[0]]
+                self.set_current_piece(self.pieces[self.unused_pieces[0]])
             self.piece_idx_pointer = 0
 
-        # special case for when puzzle is solved
-        elif not self.unused_pieces:
-            self.clear_piece(val, self.board)
-            self.unused_pieces.append(val)
-            self.current_piece = self.pieces[self.unused_pieces[0]]
-
-    # need to use dumb way of checking islands since can't guarantee that
-    # square is the first piece on the board anymore
-    @staticmethod
-    def check_square(points):
-        x_vals = [tup[0] for tup in points]
-        y_vals = [tup[1] for tup in points]
-        if (max(x_vals) - min(x_vals) == 1) and (max(y_vals) - min(y_vals) == 1):
-            return True
-        else:
-            return False
-
-    def legal_islands(self, board):
-        # use bfs to find number of distinct islands
-        board = [[elem for elem in row] for row in board]
-        board_height = len(board)
-        board_width = len(board[0])
-        island_cells = []
-
-        def island_bfs(row, col):
-            cell_queue = [(row, col)]
-
-            while cell_queue:
-                row, col = cell_queue.pop()
-                if board[row][col] != 0:
-                    continue
-                island_cells.append((row, col))
-                board[row][col] = "#"
-                for row_offset, col_offset in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                    temp_row = row + row_offset
-                    temp_col = col + col_offset
-                    if 0 <= temp_row < board_height and 0 <= temp_col < board_width and board[temp_row][
-                        temp_col] == 0:
-                        cell_queue.append((temp_row, temp_col))
-
-        for row in range(board_height):
-            for col in range(board_width):
-                if board[row][col] == 0:
-                    island_bfs(row, col)
-                    island_size = len(island_cells)
-
-                    # islands smaller than 4 are illegal
-                    if island_size < 4:
-                        return False
-
-                    # only allow square shapes for islands of size 4
-                    elif island_size == 4:
-                        if not self.check_square(island_cells):
-                            return False
-
-                    # islands of size 6,7, and 8 are impossible
-                    elif island_size in (6, 7, 8):
-                        return False
-
-                    island_cells = []
-        return True
-
-    def solve_board(self, board, pieces):
-
-        self.iterations += 1
-
-        if self.terminate:
-            return
+        self.draw_buffer()
 
-        # win condition is whole board is covered in pieces
-        if all([all(row) for row in board]):
-            self.draw_board(board)
-            self.terminate = True
-            self.solution = board
-            return
-        else:
-            piece_positions = pieces[0]
-            for position in piece_positions:
-                legal_squares = self.get_legal_squares(board, position)
-                for row, col in legal_squares:
-                    self.solve_board(self.add_piece(board, position, row, col)[0], pieces[1:])
+    def start_search(self, show):
+        # show is "solution" to fill in the board or "hint" to highlight the next piece once one is found
+        self.iterations = 0
+        self.solution = []
+        self.set_hint(None)
+
+        # the index answers straight away, and when it holds every solution a miss means there isn't one
+        if self.solution_index is not None:
+            if show == "hint":
+                hint = self.solution_index.hint(self.board)
+                if hint is not None:
+                    self.game_state = "play"
+                    self.set_hint(self.cells_placement(*hint))
+                    return
+            else:
+                solution = self.solution_index.find(self.board)
+                if solution is not None:
+                    self.finish_search(solution, show)
+                    return
+            if self.solution_index.solvable(self.board) is False:
+                self.finish_search(None, show)
+                return
 
-    def display_solution(self):
         unused_pieces = [self.pieces[idx] for idx in self.unused_pieces]
         unused_pieces = self.gen_piece_positions([0] + unused_pieces)
 
-        self.iterations = 0
-        self.solution = []
-        self.terminate = False
-        self.solve_board(self.board, unused_pieces)
-        if self.solution:
-            self.board = self.solution
-            piece_positions = self.get_piece_positions(self.solution)
-            for piece_coord in piece_positions.values():
-                self.draw_piece(piece_coord, self.board, BOARD_X_OFFSET, BOARD_Y_OFFSET)
-                self.draw_board_outline()
-                pg.display.update()
-                pg.time.wait(250)
-            self.unused_pieces = []
-            self.current_piece = [[]]
+        # the search runs next to the event loop so the window keeps drawing and Esc can stop it
+        self.search_show = show
+        self.search_rate = 0
+        self.search_depth = 0
+        self.game_state = "solving"
+        board = [[val for val in row] for row in self.board]
 
-        else:
+        # cleared here rather than in the thread, so an Esc pressed before it starts still stops it
+        self.background_solver.terminate = False
+        self.search_thread = threading.Thread(target=self.background_solver.solve, args=(board, unused_pieces),
+                                              daemon=True)
+        self.search_thread.start()
+
+    def cancel_search(self):
+        self.background_solver.terminate = True
+
+    def poll_search(self):
+        while True:
+            try:
+                message = self.search_queue.get_nowait()
+            except queue.Empty:
+                return
+
+            kind = message[0]
+            if kind == "progress":
+                _, self.iterations, self.search_rate, self.search_depth = message
+            elif kind == "solution":
+                self.solution = message[1]
+            else:
+                self.iterations = message[1]
+                self.search_thread.join()
+                if self.solution or message[2]:
+                    self.finish_search(self.solution, self.search_show)
+                else:
+                    # stopped with Esc, so nothing is known about the board
+                    self.game_state = "play"
+
+    def finish_search(self, solution, show):
+        if not solution:
             self.game_state = "failure"
+            return
+
+        self.game_state = "play"
+        if show == "hint":
+            self.display_hint(solution)
+        else:
+            self.display_solution(solution)
+
+    def display_hint(self, solution):
+        # the piece covering the first empty square in the solution, as SolutionIndex.hint finds it
+        row, col = self.placement_table.first_empty_cell(self.occupied)
+        piece = solution[row][col]
+        cells = [(i, j) for i, sol_row in enumerate(solution) for j, val in enumerate(sol_row) if val == piece]
+        self.set_hint(self.cells_placement(piece, cells))
+
+    def display_solution(self, solution):
+        self.solution = solution
+        self.board = self.solution
+        self.index_board(self.board)
+        for placement in self.placed.values():
+            self.draw_piece(placement.cells, self.board, self.board_x, self.board_y, self.square_size,
+                            self.square_size)
+            self.draw_board_outline()
+            pg.display.update()
+            pg.time.wait(250)
+        self.unused_pieces = []
+        self.set_current_piece([[]])
+
+        # the animation drew straight to the screen, so start the next frame from scratch
+        self.drawn_state = None
 
     #####################################################################
     # Main runner method
@@ -288,12 +499,15 @@ class TangramGame(TangramSolver):
 
         while True:
 
-            # draw background
-            SCREEN.blit(pg.transform.scale(BACKGROUND, (SCREEN_WIDTH, SCREEN_HEIGHT)), (0, 0))
+            # nothing here needs more than the frame rate, and waiting out the rest of the frame keeps the
+            # loop from spinning when nothing changes
+            self.clock.tick(self.fps)
 
             # draw failure state if no solutions were found
             if self.game_state == "failure":
-                self.draw_fail_state()
+                if self.drawn_state != self.game_state:
+                    self.drawn_state = self.game_state
+                    self.draw_fail_state()
                 for event in pg.event.get():
                     if event.type == pg.QUIT:
                         pg.quit()
@@ -303,7 +517,9 @@ class TangramGame(TangramSolver):
                 continue
 
             elif self.game_state == "start":
-                self.draw_start_state()
+                if self.drawn_state != self.game_state:
+                    self.drawn_state = self.game_state
+                    self.draw_start_state()
                 for event in pg.event.get():
                     if event.type == pg.QUIT:
                         pg.quit()
@@ -313,11 +529,21 @@ class TangramGame(TangramSolver):
 
                 continue
 
-            self.draw_title()
-            self.draw_text()
-            self.draw_board_pieces(self.board, BOARD_X_OFFSET, BOARD_Y_OFFSET)
-            self.draw_board_pieces(self.board_buffer, BOARD_X_OFFSET, BOARD_Y_OFFSET)
-            self.draw_board_pieces(self.current_piece, CURR_PIECE_X_OFFSET, CURR_PIECE_Y_OFFSET)
+            # keep drawing the board while the solver works, only Esc and quitting are handled
+            elif self.game_state == "solving":
+                self.poll_search()
+                if self.game_state == "solving":
+                    self.draw_play_state()
+                for event in pg.event.get():
+                    if event.type == pg.QUIT:
+                        self.cancel_search()
+                        pg.quit()
+                        sys.exit()
+                    if event.type == pg.KEYDOWN and event.key == pg.K_ESCAPE:
+                        self.cancel_search()
+                continue
+
+            self.draw_play_state()
 
             for event in pg.event.get():
                 if event.type == pg.QUIT:
@@ -326,40 +552,38 @@ class TangramGame(TangramSolver):
 
                 # add or erase tiles from the board with mouse click
                 if event.type == pg.MOUSEBUTTONDOWN:
-                    mouse_x, mouse_y = pg.mouse.get_pos()
-                    row = (mouse_y - BOARD_Y_OFFSET) // SQUARE_HEIGHT
-                    col = (mouse_x - BOARD_X_OFFSET) // SQUARE_WIDTH
-                    if (0 <= row < len(self.board)) and (0 <= col < len(self.board[0])):
-                        self.add_erase_piece(row, col)
+                    square = self.mouse_square()
+                    if square is not None:
+                        self.add_erase_piece(*square)
 
                 if event.type == pg.KEYDOWN and self.unused_pieces:
                     # rotate and flip current piece
                     if event.key == pg.K_r:
-                        self.current_piece = self.rotate_piece(self.current_piece)
+                        self.set_current_piece(self.rotate_piece(self.current_piece))
                     if event.key == pg.K_f:
-                        self.current_piece = self.reflect_piece_y(self.current_piece)
+                        self.set_current_piece(self.reflect_piece_y(self.current_piece))
 
                     # cycle through unused pieces
                     if event.key == pg.K_RIGHT or event.key == pg.K_SPACE:
                         self.piece_idx_pointer = (self.piece_idx_pointer + 1) % len(self.unused_pieces)
-                        self.current_piece = self.pieces[self.unused_pieces[self.piece_idx_pointer]]
+                        self.set_current_piece(self.pieces[self.unused_pieces[self.piece_idx_pointer]])
 
                     if event.key == pg.K_LEFT:
                         self.piece_idx_pointer = (self.piece_idx_pointer - 1) % len(self.unused_pieces)
-                        self.current_piece = self.pieces[self.unused_pieces[self.piece_idx_pointer]]
+                        self.set_current_piece(self.pieces[self.unused_pieces[self.piece_idx_pointer]])
 
                     # solve puzzle
                     if event.key == pg.K_s:
-                        self.display_solution()
+                        self.start_search("solution")
+
+                    # show where the next piece goes
+                    if event.key == pg.K_h:
+                        self.start_search("hint")
 
                 # draw preview of placement of the current tile
                 if event.type == self.draw_buffer_event:
                     self.draw_buffer()
 
-            self.draw_board_outline()
-
-            pg.display.update()
-
 
 if __name__ == "__main__":
 
@@ -0,0 +1,11 @@
+import os
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+
+
+def image_paths_in(images):
+    # a directory stands for every image in it
+    if isinstance(images, str) and os.path.isdir(images):
+        return [os.path.join(images, name) for name in sorted(os.listdir(images))
+                if name.lower().endswith(IMAGE_EXTENSIONS)]
+    return list(images)
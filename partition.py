@@ -0,0 +1,156 @@
+import argparse
+import random
+import time
+
+
+NEIGHBOUR_STEPS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+
+
+class Partitioner:
+
+    # Splits a shape into pieces in time roughly linear in its area. Each piece grows from the first
+    # unassigned square in row-major order by picking random squares off its frontier, the free squares
+    # touching it, and a square -> piece index means merging pieces that came out too small only ever
+    # looks at the squares of the pieces involved.
+
+    def __init__(self, shape, max_piece_size, min_piece_size, seed=None):
+        self.shape = set(shape)
+        self.max_piece_size = max_piece_size
+        self.min_piece_size = min_piece_size
+
+        # a seed gives the same pieces every time, without one the module's random state is used
+        self.random = random.Random(seed) if seed is not None else random
+
+        self.piece_of = {}
+        self.pieces = {}
+
+    def free_neighbours(self, cell):
+        row, col = cell
+        for d_row, d_col in NEIGHBOUR_STEPS:
+            neighbour = (row + d_row, col + d_col)
+            if neighbour in self.shape and neighbour not in self.piece_of:
+                yield neighbour
+
+    def grow_piece(self, piece_id, start):
+        piece = [start]
+        self.piece_of[start] = piece_id
+
+        # frontier kept as a list for picking at random plus an index into it for removing in constant time
+        frontier = []
+        frontier_index = {}
+        for neighbour in self.free_neighbours(start):
+            frontier_index[neighbour] = len(frontier)
+            frontier.append(neighbour)
+
+        while frontier and len(piece) < self.max_piece_size:
+            i = self.random.randrange(len(frontier))
+            cell = frontier[i]
+            last = frontier.pop()
+            if i < len(frontier):
+                frontier[i] = last
+                frontier_index[last] = i
+            del frontier_index[cell]
+
+            piece.append(cell)
+            self.piece_of[cell] = piece_id
+            for neighbour in self.free_neighbours(cell):
+                if neighbour not in frontier_index:
+                    frontier_index[neighbour] = len(frontier)
+                    frontier.append(neighbour)
+
+        self.pieces[piece_id] = piece
+
+    def neighbour_pieces(self, piece_id):
+        neighbours = []
+        for row, col in self.pieces[piece_id]:
+            for d_row, d_col in NEIGHBOUR_STEPS:
+                other_id = self.piece_of.get((row + d_row, col + d_col))
+                if other_id is not None and other_id != piece_id and other_id not in neighbours:
+                    neighbours.append(other_id)
+        return neighbours
+
+    def merge_small_pieces(self):
+        # a piece that's too small joins a neighbour, one it still fits in with if there is one, otherwise going
+        # over the largest size beats leaving it. The smaller of the two is relabelled so each square is only
+        # moved a few times
+        small = [piece_id for piece_id, piece in self.pieces.items() if len(piece) < self.min_piece_size]
+        while small:
+            piece_id = small.pop()
+            if piece_id not in self.pieces or len(self.pieces[piece_id]) >= self.min_piece_size:
+                continue
+
+            size = len(self.pieces[piece_id])
+            neighbours = self.neighbour_pieces(piece_id)
+            fitting = [other_id for other_id in neighbours
+                       if len(self.pieces[other_id]) + size <= self.max_piece_size]
+            candidates = fitting or neighbours
+            if not candidates:
+                continue
+
+            other_id = self.random.choice(candidates)
+            keep_id, gone_id = other_id, piece_id
+            if len(self.pieces[keep_id]) < len(self.pieces[gone_id]):
+                keep_id, gone_id = gone_id, keep_id
+            for cell in self.pieces[gone_id]:
+                self.piece_of[cell] = keep_id
+            self.pieces[keep_id].extend(self.pieces.pop(gone_id))
+
+            if len(self.pieces[keep_id]) < self.min_piece_size:
+                small.append(keep_id)
+
+    def partition(self):
+        # sorting once replaces looking for the top left most free square before every piece
+        for cell in sorted(self.shape):
+            if cell not in self.piece_of:
+                self.grow_piece(len(self.pieces), cell)
+        self.merge_small_pieces()
+        return [set(piece) for piece in self.pieces.values()]
+
+
+def partition_shape(shape, max_piece_size, min_piece_size, seed=None):
+    return Partitioner(shape, max_piece_size, min_piece_size, seed).partition()
+
+
+def disc_shape(grid_size):
+    # a filled circle, something like what comes out of an image, for benchmarking
+    centre = (grid_size - 1) / 2
+    radius = grid_size / 2
+    return {(row, col) for row in range(grid_size) for col in range(grid_size)
+            if (row - centre) ** 2 + (col - centre) ** 2 <= radius ** 2}
+
+
+def benchmark(grid_sizes=(20, 50, 100, 200), max_piece_size=5, min_piece_size=3, baseline_max=50, seed=0):
+    # the old random walk split is only timed up to baseline_max, it's quadratic and slow beyond that
+    from piece_generator import split_shape_into_pieces, merge_single_pieces
+
+    for grid_size in grid_sizes:
+        shape = disc_shape(grid_size)
+
+        start = time.perf_counter()
+        pieces = partition_shape(shape, max_piece_size, min_piece_size, seed)
+        elapsed = time.perf_counter() - start
+
+        covered = set().union(*pieces)
+        assert covered == shape and sum(map(len, pieces)) == len(shape)
+        line = (f"Grid: {grid_size}x{grid_size}  Squares: {len(shape):,}  Pieces: {len(pieces):,}  "
+                f"Partition: {elapsed * 1000:,.1f}ms  Squares per second: {len(shape) / max(elapsed, 1e-9):,.0f}")
+
+        if grid_size <= baseline_max:
+            random.seed(seed)
+            start = time.perf_counter()
+            merge_single_pieces(split_shape_into_pieces(shape, max_piece_size, min_piece_size))
+            line += f"  Random walk: {(time.perf_counter() - start) * 1000:,.1f}ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark splitting shapes into pieces")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 50, 100, 200], help="grid sizes to split")
+    parser.add_argument("--max-piece-size", type=int, default=5, help="most squares in a piece")
+    parser.add_argument("--min-piece-size", type=int, default=3, help="fewest squares in a piece")
+    parser.add_argument("--baseline-max", type=int, default=50,
+                        help="largest grid to also time the old random walk split on")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the split")
+    args = parser.parse_args()
+
+    benchmark(args.sizes, args.max_piece_size, args.min_piece_size, args.baseline_max, args.seed)
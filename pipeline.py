@@ -0,0 +1,122 @@
+from piece_generator import convert_image_to_coordinates, combine_pieces, print_combined_grid
+from partition import partition_shape
+from puzzle import puzzle_from_pieces, save_puzzle
+import argparse
+import hashlib
+import json
+import os
+import numpy as np
+
+
+def content_hash(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:24]
+
+
+class PuzzlePipeline:
+
+    # image -> mask -> grid -> pieces -> puzzle, with every stage's output kept on disk under a hash of its
+    # input and parameters. Each key is built from the key of the stage before it, so changing the grid size
+    # or piece sizes reuses the mask and only redoes the stages after it.
+
+    def __init__(self, cache_dir="stored_objects/pipeline"):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def cached(self, stage, key, compute, save, load):
+        path = os.path.join(self.cache_dir, f"{stage}-{key}")
+        if os.path.exists(path):
+            with open(path, "rb") as stage_file:
+                return load(stage_file)
+
+        result = compute()
+
+        # written under another name first so an interrupted run never leaves half a stage behind
+        with open(path + ".tmp", "wb") as stage_file:
+            save(result, stage_file)
+        os.replace(path + ".tmp", path)
+        return result
+
+    @staticmethod
+    def save_json(result, stage_file):
+        stage_file.write(json.dumps(result).encode())
+
+    @staticmethod
+    def load_json(stage_file):
+        return json.loads(stage_file.read())
+
+    def mask(self, image_path, grid_size=None):
+        # with a grid size the mask is made from a shrunk image, fine for that grid and any smaller one
+        with open(image_path, "rb") as image_file:
+            key = content_hash("mask", image_file.read(), grid_size)
+
+        def compute():
+            # rembg takes a while to import, and isn't needed at all once the mask is cached
+            from edge_detection import extract_shape
+            return extract_shape(image_path, grid_size=grid_size)
+
+        return key, self.cached("mask", key, compute, lambda result, stage_file: np.save(stage_file, result), np.load)
+
+    def grid(self, mask_key, mask, grid_size):
+        key = content_hash("grid", mask_key, grid_size)
+        shape = self.cached("grid", key, lambda: sorted(convert_image_to_coordinates(mask, grid_size)),
+                            self.save_json, self.load_json)
+        return key, {tuple(cell) for cell in shape}
+
+    def pieces(self, grid_key, shape, max_piece_size, min_piece_size, seed):
+        key = content_hash("pieces", "partition", grid_key, max_piece_size, min_piece_size, seed)
+
+        def compute():
+            return [sorted(piece) for piece in partition_shape(shape, max_piece_size, min_piece_size, seed)]
+
+        pieces = self.cached("pieces", key, compute, self.save_json, self.load_json)
+        return key, [{tuple(cell) for cell in piece} for piece in pieces]
+
+    def puzzle(self, pieces_key, pieces):
+        # the pieces came from cutting up the board, so putting them back is always a solution
+        key = content_hash("puzzle", pieces_key)
+        puzzle = self.cached("puzzle", key, lambda: list(puzzle_from_pieces(pieces)), self.save_json, self.load_json)
+        return key, puzzle
+
+    def run(self, image_path, max_grid_size=20, max_piece_size=5, min_piece_size=3, max_pieces=12, seed=0,
+            fast=False):
+        # shrink the grid until the shape splits into few enough pieces, the way Piece Generator.py does
+        mask_key, mask = self.mask(image_path, max_grid_size if fast else None)
+        grid_size = max_grid_size
+        while True:
+            grid_key, shape = self.grid(mask_key, mask, grid_size)
+            pieces_key, pieces = self.pieces(grid_key, shape, max_piece_size, min_piece_size, seed)
+            if len(pieces) <= max_pieces or grid_size <= min_piece_size:
+                break
+            grid_size -= 1
+
+        _, (board_mask, piece_grids) = self.puzzle(pieces_key, pieces)
+        return grid_size, pieces, board_mask, piece_grids
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Turn an image into a tangram puzzle, caching every stage")
+    parser.add_argument("image", help="image to make a puzzle from")
+    parser.add_argument("--grid-size", type=int, default=20, help="largest grid to try")
+    parser.add_argument("--max-piece-size", type=int, default=5, help="most squares in a piece")
+    parser.add_argument("--min-piece-size", type=int, default=3, help="fewest squares in a piece")
+    parser.add_argument("--max-pieces", type=int, default=12, help="shrink the grid until there are this few pieces")
+    parser.add_argument("--seed", type=int, default=0, help="seed for splitting the shape into pieces")
+    parser.add_argument("--fast", action="store_true", help="shrink the image to what the grid needs first")
+    parser.add_argument("--cache", default="stored_objects/pipeline", help="directory to cache each stage in")
+    parser.add_argument("--output", help="puzzle file to write for tangram.py --puzzle")
+    args = parser.parse_args()
+
+    pipeline = PuzzlePipeline(args.cache)
+    grid_size, pieces, board_mask, piece_grids = pipeline.run(args.image, args.grid_size, args.max_piece_size,
+                                                              args.min_piece_size, args.max_pieces, args.seed,
+                                                              args.fast)
+
+    print(f"Grid size: {grid_size}")
+    print(f"Pieces: {len(pieces)}\n")
+    print_combined_grid(combine_pieces([[0] * grid_size for _ in range(grid_size)], pieces))
+    if args.output:
+        save_puzzle(args.output, board_mask, piece_grids)
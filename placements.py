@@ -0,0 +1,77 @@
+from collections import namedtuple
+
+
+Placement = namedtuple("Placement", ["piece", "row", "col", "cells", "mask"])
+
+
+class PlacementTable:
+
+    def __init__(self, board_height, board_width, piece_positions=(), blocked=0):
+        self.board_height = board_height
+        self.board_width = board_width
+        self.full_mask = (1 << (board_height * board_width)) - 1
+
+        # squares outside the board's shape, always counted as occupied and never covered by a placement
+        self.blocked = blocked
+
+        # (position key, row, col) -> placement of that position with its top left corner at (row, col)
+        self.by_origin = {}
+
+        # position key -> placement indexed by the board cell its first filled square lands on
+        self.by_anchor = {}
+
+        for positions in piece_positions:
+            for position in positions:
+                self.add_position(position)
+
+    @staticmethod
+    def position_key(position):
+        return tuple(tuple(row) for row in position)
+
+    def add_position(self, position):
+        key = self.position_key(position)
+        if key in self.by_anchor:
+            return self.by_anchor[key]
+
+        anchors = [None] * (self.board_height * self.board_width)
+        self.by_anchor[key] = anchors
+
+        filled = [(i, j, val) for i, row in enumerate(position) for j, val in enumerate(row) if val]
+        if not filled:
+            return anchors
+
+        piece_height = len(position)
+        piece_width = len(position[0])
+        anchor_row, anchor_col, piece_val = filled[0]
+
+        for row in range(self.board_height - piece_height + 1):
+            for col in range(self.board_width - piece_width + 1):
+                cells = tuple((row + i, col + j) for i, j, _ in filled)
+                mask = 0
+                for cell_row, cell_col in cells:
+                    mask |= 1 << (cell_row * self.board_width + cell_col)
+                if mask & self.blocked:
+                    continue
+                placement = Placement(piece_val, row, col, cells, mask)
+                self.by_origin[key, row, col] = placement
+                anchors[(row + anchor_row) * self.board_width + col + anchor_col] = placement
+
+        return anchors
+
+    def anchor_list(self, position):
+        return self.add_position(position)
+
+    def board_mask(self, board):
+        mask = self.blocked
+        for i, row in enumerate(board):
+            for j, val in enumerate(row):
+                if val:
+                    mask |= 1 << (i * self.board_width + j)
+        return mask
+
+    def first_empty_cell(self, occupied):
+        # lowest clear bit is the first empty square in row-major order
+        if occupied == self.full_mask:
+            return None
+        return divmod(((occupied + 1) & ~occupied).bit_length() - 1, self.board_width)
+
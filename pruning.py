@@ -0,0 +1,101 @@
+class IslandPolicy:
+
+    # Decides which empty islands can still be filled by the remaining pieces. Islands are bitmasks over
+    # the board, grown with shifts, and after a placement only the islands touching the newly filled
+    # squares are looked at since every other island is the same as it was one move earlier.
+
+    def __init__(self, board_height, board_width, mod_five=True, small_islands=True, min_size=0, multiple=1):
+        self.board_height = board_height
+        self.board_width = board_width
+        self.full_mask = (1 << (board_height * board_width)) - 1
+
+        # column masks stop horizontal shifts from wrapping onto the neighbouring row
+        first_col = sum(1 << (row * board_width) for row in range(board_height))
+        self.not_first_col = self.full_mask ^ first_col
+        self.not_last_col = self.full_mask ^ (first_col << (board_width - 1))
+
+        # every island has to be a multiple of 5 squares, apart from one that the square can make up
+        self.mod_five = mod_five
+
+        # islands smaller than 4, of 4 that aren't the square, or of 6 to 8 squares can't be filled
+        self.small_islands = small_islands
+
+        # the same rules for any set of pieces: an island has to fit the smallest piece, and be made up of
+        # squares in multiples of the greatest common divisor of the piece sizes
+        self.min_size = min_size
+        self.multiple = multiple
+
+    def neighbours(self, mask):
+        return self.full_mask & ((mask << self.board_width) |
+                                 (mask >> self.board_width) |
+                                 ((mask << 1) & self.not_first_col) |
+                                 ((mask >> 1) & self.not_last_col))
+
+    def grow_island(self, seed, empty):
+        island = seed
+        while True:
+            grown = island | (self.neighbours(island) & empty)
+            if grown == island:
+                return island
+            island = grown
+
+    def is_square(self, island):
+        low_bit = island & -island
+        if not low_bit & self.not_last_col:
+            return False
+        return island == low_bit * (3 | (3 << self.board_width))
+
+    def legal_island(self, island, square_remaining=False):
+        island_size = island.bit_count()
+
+        if island_size < self.min_size or island_size % self.multiple:
+            return False
+
+        if self.mod_five and island_size % 5 != 0:
+            if not (square_remaining and island_size % 5 == 4):
+                return False
+
+        if self.small_islands:
+            if island_size < 4:
+                return False
+            elif island_size == 4 and not self.is_square(island):
+                return False
+            elif island_size in (6, 7, 8):
+                return False
+
+        return True
+
+    def needs_square(self, island):
+        # 4 squares short of a multiple of 5, only the square can make that up and it only fills one island
+        return self.mod_five and island.bit_count() % 5 == 4
+
+    def legal_board(self, occupied, square_remaining=False):
+        empty = self.full_mask & ~occupied
+        short_island = False
+        while empty:
+            island = self.grow_island(empty & -empty, empty)
+            if not self.legal_island(island, square_remaining):
+                return False
+            if square_remaining and self.needs_square(island):
+                if short_island:
+                    return False
+                short_island = True
+            empty ^= island
+        return True
+
+    def legal_placement(self, occupied, placed, square_remaining=False):
+        # only islands bordering the squares that were just filled can have changed, so at most one of those
+        # can be left for the square, an untouched one waiting for it isn't seen here
+        empty = self.full_mask & ~occupied
+        frontier = self.neighbours(placed) & empty
+        short_island = False
+        while frontier:
+            island = self.grow_island(frontier & -frontier, empty)
+            if not self.legal_island(island, square_remaining):
+                return False
+            if square_remaining and self.needs_square(island):
+                if short_island:
+                    return False
+                short_island = True
+            frontier &= ~island
+        return True
@@ -0,0 +1,36 @@
+import json
+
+
+# A puzzle file is JSON holding the board mask, 1 on every square to fill and 0 outside the board, and the
+# pieces as grids with a nonzero value on every square they cover:
+#   {"board": [[0, 1, 1], [1, 1, 1]], "pieces": [[[1, 1], [1, 0]], [[1, 1, 1]]]}
+
+def load_puzzle(path):
+    with open(path) as puzzle_file:
+        puzzle = json.load(puzzle_file)
+    return puzzle["board"], puzzle["pieces"]
+
+
+def save_puzzle(path, board_mask, pieces):
+    with open(path, "w") as puzzle_file:
+        json.dump({"board": board_mask, "pieces": pieces}, puzzle_file)
+
+
+def cells_to_grid(cells, val=1):
+    # the smallest grid holding a set of (row, col) squares, with val on each of them
+    top = min(row for row, _ in cells)
+    left = min(col for _, col in cells)
+    height = max(row for row, _ in cells) - top + 1
+    width = max(col for _, col in cells) - left + 1
+    grid = [[0] * width for _ in range(height)]
+    for row, col in cells:
+        grid[row - top][col - left] = val
+    return grid
+
+
+def puzzle_from_pieces(pieces):
+    # pieces as sets of (row, col) squares, the way split_shape_into_pieces returns them, where the board
+    # is every square they cover between them
+    board_mask = cells_to_grid(set().union(*pieces))
+    piece_grids = [cells_to_grid(piece, i + 1) for i, piece in enumerate(pieces)]
+    return board_mask, piece_grids
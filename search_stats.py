@@ -0,0 +1,74 @@
+TRIED, BOUNDS, OVERLAP, ISLANDS = range(4)
+
+
+class SearchStats:
+
+    # Counts of what the search did at every depth and with every piece. A placement is tried once for each
+    # orientation of each remaining piece at the first empty square, and is then either off the board (or on
+    # a square outside its shape), overlapping a piece already placed, rejected by the island check, or
+    # searched. Time in the island check is kept so its rejections can be weighed against what it costs.
+
+    def __init__(self):
+        # depth -> boards whose placements were generated
+        self.nodes = {}
+
+        # (depth, piece) -> [tried, bounds, overlap, islands]
+        self.placements = {}
+
+        self.island_checks = 0
+        self.island_seconds = 0.0
+
+    def counts(self, depth, piece):
+        key = (depth, piece)
+        if key not in self.placements:
+            self.placements[key] = [0, 0, 0, 0]
+        return self.placements[key]
+
+    def by_depth(self):
+        totals = {}
+        for (depth, _), counts in self.placements.items():
+            total = totals.setdefault(depth, [0, 0, 0, 0])
+            for i, count in enumerate(counts):
+                total[i] += count
+        return totals
+
+    def by_piece(self):
+        totals = {}
+        for (_, piece), counts in self.placements.items():
+            total = totals.setdefault(piece, [0, 0, 0, 0])
+            for i, count in enumerate(counts):
+                total[i] += count
+        return totals
+
+    @staticmethod
+    def format_counts(counts):
+        searched = counts[TRIED] - counts[BOUNDS] - counts[OVERLAP] - counts[ISLANDS]
+        return (f"Tried: {counts[TRIED]:>12,}  Bounds: {counts[BOUNDS]:>11,}  Overlap: {counts[OVERLAP]:>11,}  "
+                f"Islands: {counts[ISLANDS]:>11,}  Searched: {searched:>11,}")
+
+    def report(self, elapsed=None):
+        print("Depth")
+        depth_totals = self.by_depth()
+        for depth in sorted(self.nodes):
+            print(f"{depth:>5}  Nodes: {self.nodes[depth]:>11,}  {self.format_counts(depth_totals.get(depth, [0] * 4))}")
+
+        print("Piece")
+        for piece, counts in sorted(self.by_piece().items()):
+            print(f"{piece:>5}  {self.format_counts(counts)}")
+
+        rejected = sum(counts[ISLANDS] for counts in self.placements.values())
+        line = (f"Island checks: {self.island_checks:,}  Rejected: {rejected:,}  "
+                f"Time: {self.island_seconds:.2f}s")
+        if elapsed:
+            line += f"  ({self.island_seconds / elapsed:.0%} of the search)"
+        print(line)
+
+    def as_dict(self):
+        return {
+            "nodes": [{"depth": depth, "nodes": nodes} for depth, nodes in sorted(self.nodes.items())],
+            "placements": [{"depth": depth, "piece": piece, "tried": counts[TRIED], "bounds": counts[BOUNDS],
+                            "overlap": counts[OVERLAP], "islands": counts[ISLANDS]}
+                           for (depth, piece), counts in sorted(self.placements.items())],
+            "island_checks": self.island_checks,
+            "island_seconds": self.island_seconds,
+        }
@@ -36,9 +36,21 @@ SQUARE_MARGIN = 2
 BOARD_X_OFFSET = 145
 BOARD_Y_OFFSET = 120
 
+# space the board is drawn in, boards bigger than 8x8 get smaller squares to fit
+BOARD_WIDTH = 400
+BOARD_HEIGHT = 400
+
+# squares outside the shape of the board
+BLOCKED_COLOR = (40, 40, 40)
+
 CURR_PIECE_X_OFFSET = 400
 CURR_PIECE_Y_OFFSET = 540
 
 LINE_THICKNESS = 5
 
-BACKGROUND = pg.image.load("assets/background.jpg")
\ No newline at end of file
+FPS = 30
+
+BACKGROUND = pg.image.load("assets/background.jpg")
+
+# built with solution_index.py, the solver searches instead when it isn't there
+SOLUTION_INDEX_PATH = "solutions/index.pickle"
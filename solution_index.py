@@ -0,0 +1,142 @@
+from solution_store import SolutionReader
+from symmetry import board_symmetries
+from array import array
+import argparse
+import pickle
+
+
+class SolutionIndex:
+
+    # Answers "which solution finishes this board" without searching. Each solution is stored as the mask
+    # of squares every piece covers, and every (piece, mask) pair points at the solutions that place the
+    # piece there, so a lookup only has to check the solutions sharing the rarest placement on the board.
+    # Solutions are only needed once per equivalence class, a board is looked up under every symmetry.
+
+    def __init__(self, board_height=8, board_width=8, complete=False):
+        self.board_height = board_height
+        self.board_width = board_width
+        self.symmetries = board_symmetries(board_height, board_width)
+
+        # set when the solutions are every solution of the empty board up to symmetry, only then does a
+        # failed lookup mean there's no solution at all
+        self.complete = complete
+
+        self.solutions = []
+        self.postings = {}
+
+    @classmethod
+    def from_store(cls, path, complete=False):
+        with SolutionReader(path) as reader:
+            index = cls(reader.board_height, reader.board_width, complete)
+            for board in reader:
+                index.add(board)
+        return index
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as index_file:
+            state = pickle.load(index_file)
+        index = cls(state["board_height"], state["board_width"], state["complete"])
+        index.solutions = state["solutions"]
+        index.postings = state["postings"]
+        return index
+
+    def save(self, path):
+        state = {
+            "board_height": self.board_height,
+            "board_width": self.board_width,
+            "complete": self.complete,
+            "solutions": self.solutions,
+            "postings": self.postings,
+        }
+        with open(path, "wb") as index_file:
+            pickle.dump(state, index_file)
+
+    def piece_masks(self, board):
+        masks = {}
+        for i, row in enumerate(board):
+            for j, val in enumerate(row):
+                if val:
+                    masks[val] = masks.get(val, 0) | (1 << (i * self.board_width + j))
+        return masks
+
+    def add(self, board):
+        solution_id = len(self.solutions)
+        masks = self.piece_masks(board)
+        self.solutions.append(masks)
+        for piece_mask in masks.items():
+            self.postings.setdefault(piece_mask, array("I")).append(solution_id)
+
+    def __len__(self):
+        return len(self.solutions)
+
+    def matches(self, placed):
+        # ids of the stored solutions with every placed piece exactly where it is on the board
+        if not placed:
+            yield from range(len(self.solutions))
+            return
+
+        postings = [self.postings.get(piece_mask, ()) for piece_mask in placed.items()]
+        for solution_id in min(postings, key=len):
+            masks = self.solutions[solution_id]
+            if all(masks.get(val) == mask for val, mask in placed.items()):
+                yield solution_id
+
+    def solution_board(self, masks):
+        board = [[0] * self.board_width for _ in range(self.board_height)]
+        for val, mask in masks.items():
+            while mask:
+                row, col = divmod((mask & -mask).bit_length() - 1, self.board_width)
+                board[row][col] = val
+                mask &= mask - 1
+        return board
+
+    def find(self, board):
+        # a solution that keeps every piece already on the board where it is, None if there isn't one stored
+        for symmetry in self.symmetries:
+            image = symmetry(board)
+            for solution_id in self.matches(self.piece_masks(image)):
+                solution = self.solution_board(self.solutions[solution_id])
+
+                # map the stored solution back onto the board the way it was given
+                for inverse in self.symmetries:
+                    candidate = inverse(solution)
+                    if all(not val or candidate[i][j] == val
+                           for i, row in enumerate(board) for j, val in enumerate(row)):
+                        return candidate
+        return None
+
+    def solvable(self, board):
+        # True or False, or None when the index isn't complete and doesn't know of a solution
+        if self.find(board) is not None:
+            return True
+        return False if self.complete else None
+
+    def hint(self, board):
+        # the piece, and the squares it goes on, that covers the first empty square in a solution
+        solution = self.find(board)
+        if solution is None:
+            return None
+
+        for i, row in enumerate(board):
+            for j, val in enumerate(row):
+                if not val:
+                    piece = solution[i][j]
+                    cells = [(cell_row, cell_col) for cell_row in range(self.board_height)
+                             for cell_col in range(self.board_width) if solution[cell_row][cell_col] == piece]
+                    return piece, cells
+        return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a solution index from a binary solution store")
+    parser.add_argument("store", help="binary solution store to index")
+    parser.add_argument("--output", default="solutions/index.pickle", help="where to write the index")
+    parser.add_argument("--complete", action="store_true",
+                        help="the store holds every solution of the empty board, so a failed lookup means unsolvable")
+    args = parser.parse_args()
+
+    solution_index = SolutionIndex.from_store(args.store, args.complete)
+    solution_index.save(args.output)
+    print(f"Solutions: {len(solution_index):,}")
+    print(f"Placements: {len(solution_index.postings):,}")
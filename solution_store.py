@@ -0,0 +1,110 @@
+import mmap
+import os
+import struct
+
+
+# file layout: a 16 byte header followed by one fixed width record per solution, each record being every
+# cell of the board in row-major order packed into bits_per_cell bits
+MAGIC = b"TANGRAM1"
+HEADER = struct.Struct("<8sHHB3x")
+
+
+class SolutionWriter:
+
+    def __init__(self, path, board_height=8, board_width=8, bits_per_cell=4):
+        self.board_height = board_height
+        self.board_width = board_width
+        self.bits_per_cell = bits_per_cell
+        self.max_value = (1 << bits_per_cell) - 1
+        self.record_size = (board_height * board_width * bits_per_cell + 7) // 8
+
+        # new solutions are only ever appended, so an existing store just has to have the same layout
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER.size:
+            with open(path, "rb") as store:
+                header = read_header(store.read(HEADER.size))
+            if header != (board_height, board_width, bits_per_cell):
+                raise ValueError(f"{path} holds {header[0]}x{header[1]} boards with {header[2]} bits per cell")
+            self.file = open(path, "ab")
+        else:
+            self.file = open(path, "wb")
+            self.file.write(HEADER.pack(MAGIC, board_height, board_width, bits_per_cell))
+
+    def write(self, board):
+        packed = 0
+        shift = 0
+        for row in board:
+            for val in row:
+                if not 0 <= val <= self.max_value:
+                    raise ValueError(f"Cell value {val} doesn't fit in {self.bits_per_cell} bits")
+                packed |= val << shift
+                shift += self.bits_per_cell
+        self.file.write(packed.to_bytes(self.record_size, "little"))
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_header(header_bytes):
+    magic, board_height, board_width, bits_per_cell = HEADER.unpack(header_bytes)
+    if magic != MAGIC:
+        raise ValueError("Not a tangram solution store")
+    return board_height, board_width, bits_per_cell
+
+
+class SolutionReader:
+
+    # Memory maps the store so opening it only reads the header, and any solution can be decoded on its own.
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.board_height, self.board_width, self.bits_per_cell = read_header(self.map[:HEADER.size])
+        self.record_size = (self.board_height * self.board_width * self.bits_per_cell + 7) // 8
+        self.cell_mask = (1 << self.bits_per_cell) - 1
+
+        # a record cut short by a crash while writing is ignored
+        self.num_solutions = (len(self.map) - HEADER.size) // self.record_size
+
+    def __len__(self):
+        return self.num_solutions
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.num_solutions
+        if not 0 <= index < self.num_solutions:
+            raise IndexError("solution index out of range")
+
+        start = HEADER.size + index * self.record_size
+        packed = int.from_bytes(self.map[start:start + self.record_size], "little")
+
+        board = []
+        for _ in range(self.board_height):
+            row = []
+            for _ in range(self.board_width):
+                row.append(packed & self.cell_mask)
+                packed >>= self.bits_per_cell
+            board.append(row)
+        return board
+
+    def __iter__(self):
+        for index in range(self.num_solutions):
+            yield self[index]
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,61 @@
+def rotate_grid(grid):
+    return [list(row[::-1]) for row in zip(*grid)]
+
+
+def reflect_grid(grid):
+    return [list(row[::-1]) for row in grid]
+
+
+def grid_key(grid):
+    return tuple(tuple(row) for row in grid)
+
+
+def board_symmetries(board_height, board_width):
+    # the rotations and reflections of the dihedral group that map the board onto itself
+    def transform(turns, reflect):
+        def apply(grid):
+            for _ in range(turns):
+                grid = rotate_grid(grid)
+            return reflect_grid(grid) if reflect else grid
+        return apply
+
+    symmetries = []
+    for reflect in (False, True):
+        for turns in range(4):
+            # quarter turns only keep a board in place when it is square
+            if turns % 2 and board_height != board_width:
+                continue
+            symmetries.append(transform(turns, reflect))
+    return symmetries
+
+
+def canonical_board(board, symmetries):
+    # smallest image of the board under the symmetries, the same for every board in its equivalence class
+    return min(grid_key(symmetry(board)) for symmetry in symmetries)
+
+
+def break_symmetry(piece_positions, symmetries):
+    # Fix the orientation of one piece that no symmetry maps onto itself. Every symmetric copy of a solution
+    # has that piece in a different orientation, so keeping one orientation per orbit keeps exactly one
+    # board from each equivalence class. Returns the positions and whether the symmetry was broken, without
+    # such a piece they come back unchanged and every symmetric copy of a solution will still turn up.
+    best_piece = None
+    for i, positions in enumerate(piece_positions):
+        free_orbits = all(len({grid_key(symmetry(position)) for symmetry in symmetries}) == len(symmetries)
+                          for position in positions)
+        if free_orbits and (best_piece is None or len(positions) > len(piece_positions[best_piece])):
+            best_piece = i
+
+    piece_positions = list(piece_positions)
+    if best_piece is None or len(symmetries) == 1:
+        return piece_positions, len(symmetries) == 1
+
+    representatives = []
+    seen = set()
+    for position in piece_positions[best_piece]:
+        if grid_key(position) not in seen:
+            representatives.append(position)
+            seen.update(grid_key(symmetry(position)) for symmetry in symmetries)
+    piece_positions[best_piece] = representatives
+
+    return piece_positions, True
@@ -1,8 +1,19 @@
+from placements import PlacementTable
+from pruning import IslandPolicy
+from symmetry import board_symmetries, break_symmetry, canonical_board
+from solution_store import SolutionWriter
+from transposition import TranspositionTable
+from search_stats import SearchStats, TRIED, BOUNDS, OVERLAP, ISLANDS
+from puzzle import load_puzzle
+import argparse
+import json
+import math
+import time
 
 
 class TangramSolver:
 
-    def __init__(self):
+    def __init__(self, symmetry_breaking=True, board_mask=None, pieces=None):
 
         self.pieces = (
 
@@ -77,26 +88,86 @@ class TangramSolver:
             "💀"
         )
 
-        self.board = [[0, 0, 0, 0, 0, 0, 0, 0].copy() for _ in range(8)]
+        # any other set of pieces is numbered from 1 in the order it is given
+        self.standard_pieces = pieces is None
+        if pieces is not None:
+            self.pieces = ([],) + tuple(self.number_piece(piece, i + 1) for i, piece in enumerate(pieces))
+
+        # the island rules only treat the tangram set's 2x2 square, piece 1, specially
+        self.square_piece = 1 if self.standard_pieces else None
+
+        # the board mask has a truthy value on every square to fill, the rest are outside the board
+        if board_mask is None:
+            board_mask = [[1] * 8 for _ in range(8)]
+        board_mask = [[1 if val else 0 for val in row] for row in board_mask]
+        board_height, board_width = len(board_mask), len(board_mask[0])
+        blocked = 0
+        for i, row in enumerate(board_mask):
+            for j, val in enumerate(row):
+                if not val:
+                    blocked |= 1 << (i * board_width + j)
+
+        self.board = [[0] * board_width for _ in range(board_height)]
         self.piece_positions = self.gen_piece_positions(self.pieces)
 
-        # only generate one position for piece 10 to avoid duplicating board positions
-        for i, positions in enumerate(self.piece_positions):
-            if i == 9:
-                self.piece_positions[i] = [positions[0]]
+        # every orientation of every piece at every origin, built once for this board shape
+        self.placement_table = PlacementTable(board_height, board_width, self.piece_positions, blocked)
+        if self.standard_pieces:
+            self.island_policy = IslandPolicy(board_height, board_width)
+        else:
+            # the rules about fives and the square only hold for the tangram pieces
+            areas = [sum(1 for row in piece for val in row if val) for piece in self.pieces[1:]]
+            self.island_policy = IslandPolicy(board_height, board_width, mod_five=False, small_islands=False,
+                                              min_size=min(areas), multiple=math.gcd(*areas))
+
+        # only search one board out of every set of rotations and reflections of the empty board, otherwise,
+        # or when no piece can break the symmetry, keep every solution found but only the first board of each
+        # equivalence class
+        self.symmetries = [symmetry for symmetry in board_symmetries(board_height, board_width)
+                           if symmetry(board_mask) == board_mask]
+        self.symmetry_breaking = symmetry_breaking
+        self.symmetry_broken = False
+        self.all_positions = {self.piece_value(piece_positions): piece_positions
+                              for piece_positions in self.piece_positions}
+        if symmetry_breaking:
+            self.piece_positions, self.symmetry_broken = break_symmetry(self.piece_positions, self.symmetries)
+        self.canonical_solutions = set()
 
         self.iterations = 0
         self.solutions = []
         self.terminate = False
 
+        # optional binary store that every solution is appended to as it is found
+        self.solution_writer = None
+
+        # quiet mode skips drawing each solution and only prints progress every progress_every iterations
+        self.quiet = False
+        self.progress_every = 0
+        self.solutions_found = 0
+        self.count_table = None
+        self.start_time = time.perf_counter()
+
+        # optional SearchStats filled in by the backtracking search, None keeps it out of the search entirely
+        self.stats = None
+        self.anchor_cache = {}
+
+        # choices taken from the root to the board being searched, and how often to hand it to checkpoint()
+        self.path = []
+        self.checkpoint_every = 0
+
     def draw_board(self, board):
         for row in board:
             out_row = []
             for cell in row:
-                out_row.append(self.color_map[cell])
+                # bigger piece sets reuse the colours
+                out_row.append(self.color_map[(cell - 1) % (len(self.color_map) - 1) + 1 if cell else 0])
             print(" ".join(out_row))
         print()
 
+    @staticmethod
+    def number_piece(piece, piece_val):
+        return [[piece_val if val else 0 for val in row] for row in piece]
+
     @staticmethod
     def rotate_piece(piece):
         return [list(row[::-1]) for row in zip(*piece)]
@@ -135,105 +206,275 @@ class TangramSolver:
             piece_positions.append(self.get_all_positions(piece))
         return piece_positions
 
-    @staticmethod
-    def legal_islands(board):
-        # use bfs to find number of distinct islands
-        board = [[elem for elem in row] for row in board]
-        board_height = len(board)
-        board_width = len(board[0])
-        island_cells = []
-
-        def island_bfs(row, col):
-            cell_queue = [(row, col)]
-
-            while cell_queue:
-                row, col = cell_queue.pop()
-                if board[row][col] != 0:
+    def square_remaining(self, pieces):
+        return self.standard_pieces and any(piece_positions[0][0][0] == 1 for piece_positions in pieces)
+
+    def piece_anchors(self, piece_positions):
+        # the anchor list of every orientation of a piece, looked up once per piece rather than once per node
+        cached = self.anchor_cache.get(id(piece_positions))
+        if cached is None or cached[0] is not piece_positions:
+            cached = (piece_positions, [self.placement_table.anchor_list(position) for position in piece_positions])
+            self.anchor_cache[id(piece_positions)] = cached
+        return cached[1]
+
+    def get_mask_placements(self, pieces, occupied):
+        # the first empty square has to be covered by something, so only branch on the pieces that can cover it
+        cell = ((occupied + 1) & ~occupied).bit_length() - 1
+        square_remaining = self.square_remaining(pieces)
+        square_piece = self.square_piece
+        for i, piece_positions in enumerate(pieces):
+            for anchors in self.piece_anchors(piece_positions):
+                placement = anchors[cell]
+                if placement is None or placement.mask & occupied:
                     continue
-                island_cells.append((row, col))
-                board[row][col] = "#"
-                for row_offset, col_offset in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                    temp_row = row + row_offset
-                    temp_col = col + col_offset
-                    if 0 <= temp_row < board_height and 0 <= temp_col < board_width and board[temp_row][temp_col] == 0:
-                        cell_queue.append((temp_row, temp_col))
-
-        for row in range(board_height):
-            for col in range(board_width):
-                if board[row][col] == 0:
-                    island_bfs(row, col)
-                    island_size = len(island_cells)
-
-                    if island_size % 5 != 0:
-                        return False
-
-                    island_cells = []
-        return True
 
-    def add_piece(self, board, piece, start_row, start_col, check_islands=True):
-        piece_width = len(piece[0])
-        piece_height = len(piece)
-        legal_move = True
-        if (start_row + piece_height > len(board)) or (start_col + piece_width > len(board[0])):
-            legal_move = False
-            return board, legal_move
-
-        changed_squares = []
-        for i, row in enumerate(piece):
-            for j, val in enumerate(row):
-                # only add filled spaces, never take away
-                if val:
-                    # don't overwrite existing pieces on the board
-                    if board[start_row + i][start_col + j]:
-                        legal_move = False
-                        return board, legal_move
-                    else:
-                        changed_squares.append((start_row + i, start_col + j, val))
+                # placing the square changes the rule for every island, not just the ones it touches
+                new_occupied = occupied | placement.mask
+                if placement.piece == square_piece:
+                    legal_move = self.island_policy.legal_board(new_occupied, False)
+                else:
+                    legal_move = self.island_policy.legal_placement(new_occupied, placement.mask, square_remaining)
+                if not legal_move:
+                    continue
 
-        new_board = [[val for val in row] for row in board]
-        for changed_row, changed_col, val in changed_squares:
-            new_board[changed_row][changed_col] = val
+                yield placement, pieces[:i] + pieces[i + 1:], new_occupied
+
+    def get_counted_placements(self, pieces, occupied, depth):
+        # get_mask_placements counting every placement it tries and why each one it skips is skipped
+        stats = self.stats
+        stats.nodes[depth] = stats.nodes.get(depth, 0) + 1
+        cell = ((occupied + 1) & ~occupied).bit_length() - 1
+        square_remaining = self.square_remaining(pieces)
+        square_piece = self.square_piece
+        for i, piece_positions in enumerate(pieces):
+            counts = stats.counts(depth, self.piece_value(piece_positions))
+            for anchors in self.piece_anchors(piece_positions):
+                counts[TRIED] += 1
+                placement = anchors[cell]
+                if placement is None:
+                    counts[BOUNDS] += 1
+                    continue
+                if placement.mask & occupied:
+                    counts[OVERLAP] += 1
+                    continue
 
-        # check if the move created any illegal islands
-        if check_islands and (not self.legal_islands(new_board)):
-            legal_move = False
-            return board, legal_move
+                new_occupied = occupied | placement.mask
+                start = time.perf_counter()
+                if placement.piece == square_piece:
+                    legal_move = self.island_policy.legal_board(new_occupied, False)
+                else:
+                    legal_move = self.island_policy.legal_placement(new_occupied, placement.mask, square_remaining)
+                stats.island_seconds += time.perf_counter() - start
+                stats.island_checks += 1
+                if not legal_move:
+                    counts[ISLANDS] += 1
+                    continue
 
-        return new_board, legal_move
+                yield placement, pieces[:i] + pieces[i + 1:], new_occupied
 
-    def get_legal_squares(self, board, piece, check_islands=True):
-        legal_moves = []
-        for row in range(len(board)):
-            for col in range(len(board[0])):
-                _, legal_move = self.add_piece(board, piece, row, col, check_islands)
-                if legal_move:
-                    legal_moves.append((row, col))
-        return legal_moves
+    def get_placements(self, pieces, occupied):
+        if self.stats is None:
+            return self.get_mask_placements(pieces, occupied)
+        return self.get_counted_placements(pieces, occupied, len(self.path))
 
-    def solve_board(self, board, pieces):
+    @staticmethod
+    def fill_board(board, placed):
+        # the board with every placement written onto a copy of it
+        new_board = [[val for val in row] for row in board]
+        for placement in placed:
+            for row, col in placement.cells:
+                new_board[row][col] = placement.piece
+        return new_board
+
+    def full_orientations(self, board, pieces):
+        # the piece cut to one orientation per orbit only leaves one board of each class when the starting
+        # board looks the same under every symmetry, like the empty board, any other board gets them all back
+        if not self.symmetry_broken or all(symmetry(board) == board for symmetry in self.symmetries):
+            return pieces
+        return [self.all_positions[self.piece_value(piece_positions)] for piece_positions in pieces]
+
+    def canonical_solution(self, board):
+        return canonical_board(board, self.symmetries)
+
+    def is_new_solution(self, board):
+        # without symmetry breaking every solution turns up once per symmetry, so drop the repeats here
+        if self.symmetry_broken:
+            return True
+        canonical = self.canonical_solution(board)
+        if canonical in self.canonical_solutions:
+            return False
+        self.canonical_solutions.add(canonical)
+        return True
 
-        self.iterations += 1
+    def add_solution(self, board):
+        self.solutions.append(board)
+        if self.solution_writer is not None:
+            self.solution_writer.write(board)
+        if not self.quiet:
+            print(f"Solutions: {len(self.solutions):,}")
+            print(f"Iterations: {self.iterations:,}\n")
+            self.draw_board(board)
 
+    def report_progress(self):
+        elapsed = time.perf_counter() - self.start_time
+        print(f"Iterations: {self.iterations:,}  Solutions: {self.solutions_found:,}  "
+              f"Depth: {len(self.path)}  Iterations per second: {self.iterations / max(elapsed, 1e-9):,.0f}")
+
+    def checkpoint(self):
+        pass
+
+    def iter_solutions(self, board, pieces, occupied=None, resume_path=None):
+        # islands on the starting board are checked once, after that only the ones next to each placement
+        if occupied is None:
+            self.path = []
+            pieces = self.full_orientations(board, pieces)
+            occupied = self.placement_table.board_mask(board)
+            if not self.island_policy.legal_board(occupied, self.square_remaining(pieces)):
+                self.iterations += 1
+                return
+        yield from self.iter_placements(board, pieces, occupied, resume_path, [])
+
+    def iter_placements(self, board, pieces, occupied, resume_path, placed):
+        # the starting board is left alone, the pieces placed on it since are kept in placed and only written
+        # onto a copy of it when they cover the whole board
+
+        # boards left once the search is stopped aren't searched, so they aren't counted either
         if self.terminate:
             return
 
+        # boards on the way back down to a checkpoint were already counted before it was taken
+        if resume_path is None:
+            self.iterations += 1
+            if self.checkpoint_every and self.iterations % self.checkpoint_every == 0:
+                self.checkpoint()
+            if self.progress_every and self.iterations % self.progress_every == 0:
+                self.report_progress()
+
         # win condition is whole board is covered in pieces
-        if all([all(row) for row in board]):
-            self.solutions.append(board)
-            print(f"Solutions: {len(self.solutions):,}")
-            print(f"Iterations: {self.iterations:,}\n")
-            self.draw_board(board)
-            return board
+        if occupied == self.placement_table.full_mask:
+            solution = self.fill_board(board, placed)
+            if self.is_new_solution(solution):
+                self.solutions_found += 1
+                yield solution
         else:
-            piece_positions = pieces[0]
-            for position in piece_positions:
-                legal_squares = self.get_legal_squares(board, position)
-                for row, col in legal_squares:
-                    self.solve_board(self.add_piece(board, position, row, col)[0], pieces[1:])
+            placements = self.get_placements(pieces, occupied)
+            for choice, (placement, remaining_pieces, new_occupied) in enumerate(placements):
+                child_path = None
+                if resume_path:
+                    # every choice before the one on the resume path was finished before the checkpoint
+                    if choice < resume_path[0]:
+                        continue
+                    if choice == resume_path[0]:
+                        child_path = resume_path[1:]
+
+                self.path.append(choice)
+                placed.append(placement)
+                yield from self.iter_placements(board, remaining_pieces, new_occupied, child_path, placed)
+                placed.pop()
+                self.path.pop()
+
+    def solve_board(self, board, pieces, occupied=None, resume_path=None):
+        # solutions are yielded lazily, this keeps every one of them on the solver
+        for solution in self.iter_solutions(board, pieces, occupied, resume_path):
+            self.add_solution(solution)
+
+    def count_solutions(self, board, pieces, max_entries=1_000_000):
+        # Number of ways to finish the board, without building any of them. Symmetric copies are only
+        # counted once when the board itself is symmetric, e.g. the empty board, and a piece could break the
+        # symmetry.
+        self.iterations += 1
+        pieces = self.full_orientations(board, pieces)
+        occupied = self.placement_table.board_mask(board)
+        if not self.island_policy.legal_board(occupied, self.square_remaining(pieces)):
+            return 0
+
+        self.count_table = TranspositionTable(max_entries)
+        remaining = 0
+        for piece_positions in pieces:
+            remaining |= 1 << self.piece_value(piece_positions)
+        return self.count_from(occupied, pieces, remaining)
+
+    def count_from(self, occupied, pieces, remaining):
+        if occupied == self.placement_table.full_mask:
+            return 1
+
+        # the same squares covered with the same pieces left over has the same number of completions,
+        # however the search got there
+        key = (occupied, remaining)
+        count = self.count_table.get(key)
+        if count is not None:
+            return count
+
+        count = 0
+        for placement, remaining_pieces, new_occupied in self.get_mask_placements(pieces, occupied):
+            self.iterations += 1
+            count += self.count_from(new_occupied, remaining_pieces, remaining ^ (1 << placement.piece))
+
+        self.count_table.put(key, count)
+        return count
+
+    @staticmethod
+    def piece_value(piece_positions):
+        return max(max(row) for row in piece_positions[0])
+
+    def report_speed(self, elapsed):
+        print(f"Elapsed: {elapsed:.2f}s")
+        print(f"Iterations per second: {self.iterations / max(elapsed, 1e-9):,.0f}")
 
     def run(self):
+        self.start_time = time.perf_counter()
         self.solve_board(self.board, self.piece_positions)
+        elapsed = time.perf_counter() - self.start_time
+        self.report_speed(elapsed)
+        if self.stats is not None:
+            self.stats.report(elapsed)
 
 
 if __name__ == "__main__":
-    TangramSolver().run()
+    from engines import ENGINES, make_solver
+
+    parser = argparse.ArgumentParser(description="Find every way to tile the board with the tangram pieces")
+    parser.add_argument("--engine", choices=ENGINES, default="backtrack", help="search engine to solve with")
+    parser.add_argument("--output", help="binary solution store to append every solution to")
+    parser.add_argument("--quiet", action="store_true", help="only print progress instead of every solution")
+    parser.add_argument("--progress-every", type=int, default=1_000_000,
+                        help="iterations between progress lines in quiet mode")
+    parser.add_argument("--puzzle", help="puzzle file with the board and pieces to use instead of the tangram set")
+    parser.add_argument("--count", action="store_true", help="only count the solutions instead of listing them")
+    parser.add_argument("--table-size", type=int, default=1_000_000,
+                        help="most subboards to remember while counting")
+    parser.add_argument("--stats", action="store_true",
+                        help="count nodes and rejected placements per depth and piece, backtrack engine only")
+    parser.add_argument("--stats-output", help="JSON file to write the --stats counts to, implies --stats")
+    args = parser.parse_args()
+    args.stats = args.stats or args.stats_output is not None
+    if args.stats and args.engine != "backtrack":
+        parser.error("--stats only works with the backtrack engine")
+
+    puzzle = {}
+    if args.puzzle:
+        board_mask, pieces = load_puzzle(args.puzzle)
+        puzzle = {"board_mask": board_mask, "pieces": pieces}
+    solver = make_solver(args.engine, **puzzle)
+    if args.count:
+        start = time.perf_counter()
+        count = solver.count_solutions(solver.board, solver.piece_positions, args.table_size)
+        print(f"Solutions: {count:,}")
+        print(f"Subboards remembered: {len(solver.count_table):,}  Table hits: {solver.count_table.hits:,}")
+        solver.report_speed(time.perf_counter() - start)
+        raise SystemExit
+    if args.quiet:
+        solver.quiet = True
+        solver.progress_every = args.progress_every
+    if args.stats:
+        solver.stats = SearchStats()
+    if args.output:
+        # bigger piece sets need more than the usual 4 bits for each square's piece number
+        bits_per_cell = max(4, (len(solver.pieces) - 1).bit_length())
+        solver.solution_writer = SolutionWriter(args.output, len(solver.board), len(solver.board[0]), bits_per_cell)
+    solver.run()
+    if solver.solution_writer is not None:
+        solver.solution_writer.close()
+    if args.stats_output:
+        with open(args.stats_output, "w") as stats_file:
+            json.dump(solver.stats.as_dict(), stats_file, indent=2)
@@ -1,82 +1,260 @@
 from tangram import TangramSolver
-import pickle
+from solution_store import SolutionWriter
+import argparse
 import multiprocessing
+import os
+import pickle
 
 
 class MultiSolver(TangramSolver):
 
-    def __init__(self, process_num):
-        super().__init__()
-        self.process_num = process_num
+    def __init__(self, worker_num, result_queue=None, symmetry_breaking=True, checkpoint_every=0):
+        super().__init__(symmetry_breaking)
+        self.worker_num = worker_num
+        self.result_queue = result_queue
+        self.checkpoint_every = checkpoint_every
+        self.task_id = None
 
-    def get_legal_squares(self, board, piece, check_islands=True):
-        legal_moves = []
-        for row in range(len(board)):
-            for col in range(len(board[0])):
-                if piece[0][0] == 1 and row != self.process_num:
-                    break
-                _, legal_move = self.add_piece(board, piece, row, col, check_islands)
-                if legal_move:
-                    legal_moves.append((row, col))
-        return legal_moves
+    def checkpoint(self):
+        # the path to the board about to be searched is enough to pick the subproblem back up from here
+        if self.result_queue is not None:
+            self.result_queue.put(("checkpoint", self.worker_num, (self.task_id, list(self.path), self.iterations)))
+
+    def add_solution(self, board):
+        # stream solutions back to the parent instead of holding them in the worker
+        if self.result_queue is None:
+            self.solutions.append(board)
+        else:
+            self.result_queue.put(("solution", self.worker_num, (self.task_id, board)))
 
-    def solve_board(self, board, pieces, save_results=False):
+    def full_orientations(self, board, pieces):
+        # subproblems come out of split_board, which starts from every orientation when its board needs them,
+        # so a worker searches with the pieces it's given
+        return pieces
 
+    def split_board(self, board, pieces, depth):
+        # expand the search tree breadth first to the given depth and return the boards there, with the
+        # pieces still to place, as independent subproblems
         self.iterations += 1
+        pieces = super().full_orientations(board, pieces)
+        occupied = self.placement_table.board_mask(board)
+        if not self.island_policy.legal_board(occupied, self.square_remaining(pieces)):
+            return []
 
-        if (self.iterations % 10_000_000 == 0) and save_results:
-            FileStore = open(f"stored_objects/solutions_duplicates_{self.process_num}.pickle", "wb")
-            pickle.dump(self.solutions, FileStore)
-            FileStore.close()
+        # each frontier entry keeps the placements made on the board rather than a copy of it
+        frontier = [([], pieces, occupied)]
+        for _ in range(depth):
+            next_frontier = []
+            for placed, pieces, occupied in frontier:
+                if occupied == self.placement_table.full_mask:
+                    solution = self.fill_board(board, placed)
+                    if self.is_new_solution(solution):
+                        self.add_solution(solution)
+                    continue
+                for placement, remaining_pieces, new_occupied in self.get_placements(pieces, occupied):
+                    self.iterations += 1
+                    next_frontier.append((placed + [placement], remaining_pieces, new_occupied))
+            frontier = next_frontier
 
-        if self.terminate:
-            return
+        subproblems = []
+        for placed, pieces, occupied in frontier:
+            if occupied == self.placement_table.full_mask:
+                solution = self.fill_board(board, placed)
+                if self.is_new_solution(solution):
+                    self.add_solution(solution)
+            else:
+                subproblems.append((self.fill_board(board, placed), pieces))
+        return subproblems
 
-        # win condition is whole board is covered in pieces
-        if all([all(row) for row in board]):
-            self.solutions.append(board)
-            print(f"Process Number: {self.process_num}")
-            print(f"Solutions: {len(self.solutions):,}")
-            print(f"Iterations: {self.iterations:,}\n")
-            return board
+
+def solve_worker(worker_num, task_queue, result_queue, symmetry_breaking=True, checkpoint_every=0):
+    solver = MultiSolver(worker_num, result_queue, symmetry_breaking, checkpoint_every)
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+
+        # iterations are counted per subproblem so a resumed one carries on from its checkpoint
+        task_id, board, pieces, resume_path, task_iterations = task
+        solver.task_id = task_id
+        solver.iterations = task_iterations
+        solver.path = []
+        solver.solve_board(board, pieces, resume_path=resume_path)
+
+        # the parent already counted the root of each subproblem
+        result_queue.put(("done", worker_num, (task_id, solver.iterations - 1)))
+
+
+#####################################################################
+# Checkpoint log
+#####################################################################
+# The log is a stream of pickled records that only ever gets appended to:
+#   ("split", split_depth, num_subproblems)
+#   ("checkpoint", task_id, path, iterations, solutions found in the task since its last record)
+#   ("done", task_id, iterations, solutions found in the task since its last record)
+# so writing a checkpoint costs the same no matter how many solutions have been found so far.
+
+def append_checkpoint(log_file, record):
+    pickle.dump(record, log_file)
+    log_file.flush()
+    os.fsync(log_file.fileno())
+
+
+def load_checkpoint(checkpoint_path):
+    split = None
+    progress = {}
+    finished = {}
+    solutions = []
+    with open(checkpoint_path, "rb") as log_file:
+        while True:
+            # a record cut off by a crash is dropped along with anything after it
+            try:
+                record = pickle.load(log_file)
+            except (EOFError, pickle.UnpicklingError):
+                break
+
+            if record[0] == "split":
+                split = record[1:]
+            elif record[0] == "checkpoint":
+                _, task_id, path, iterations, new_solutions = record
+                progress[task_id] = (path, iterations)
+                solutions.extend(new_solutions)
+            elif record[0] == "done":
+                _, task_id, iterations, new_solutions = record
+                progress.pop(task_id, None)
+                finished[task_id] = iterations
+                solutions.extend(new_solutions)
+
+    return split, progress, finished, solutions
+
+
+def solve_parallel(num_workers=None, split_depth=3, symmetry_breaking=True, board=None, pieces=None,
+                   checkpoint_path=None, checkpoint_every=10_000_000, resume=False, output_path=None):
+    num_workers = num_workers or os.cpu_count()
+
+    progress = {}
+    finished = {}
+    solutions = []
+    if resume and checkpoint_path and os.path.exists(checkpoint_path):
+        split, progress, finished, solutions = load_checkpoint(checkpoint_path)
+        if split is not None:
+            split_depth = split[0]
+
+    # splitting is deterministic, so a resumed run gets back the same numbered subproblems
+    splitter = MultiSolver(-1, symmetry_breaking=symmetry_breaking)
+    board = splitter.board if board is None else board
+    pieces = splitter.piece_positions if pieces is None else pieces
+    subproblems = splitter.split_board(board, pieces, split_depth)
+
+    log_file = None
+    if checkpoint_path:
+        if resume and os.path.exists(checkpoint_path):
+            log_file = open(checkpoint_path, "ab")
         else:
-            piece_positions = pieces[0]
-            for position in piece_positions:
-                legal_squares = self.get_legal_squares(board, position)
-                for row, col in legal_squares:
-                    self.solve_board(self.add_piece(board, position, row, col)[0], pieces[1:], save_results)
+            log_file = open(checkpoint_path, "wb")
+            append_checkpoint(log_file, ("split", split_depth, len(subproblems)))
+
+    # workers pull subproblems off one shared queue, so nobody sits idle while work is left
+    task_queue = multiprocessing.Queue()
+    result_queue = multiprocessing.Queue()
+    remaining_tasks = 0
+    for task_id, (sub_board, sub_pieces) in enumerate(subproblems):
+        if task_id in finished:
+            continue
+        resume_path, task_iterations = progress.get(task_id, (None, 0))
+        task_queue.put((task_id, sub_board, sub_pieces, resume_path, task_iterations))
+        remaining_tasks += 1
+    for _ in range(num_workers):
+        task_queue.put(None)
 
-    def run(self, save_results=False):
-        self.solve_board(self.board, self.piece_positions, save_results)
+    workers = []
+    for worker_num in range(num_workers):
+        worker = multiprocessing.Process(target=solve_worker,
+                                         args=(worker_num, task_queue, result_queue, symmetry_breaking,
+                                               checkpoint_every if log_file else 0))
+        worker.start()
+        workers.append(worker)
 
-        if save_results:
-            FileStore = open(f"stored_objects/solutions_duplicates_{self.process_num}.pickle", "wb")
-            pickle.dump(self.solutions, FileStore)
-            FileStore.close()
+    print(f"Workers: {num_workers}")
+    print(f"Subproblems: {len(subproblems):,} ({len(subproblems) - remaining_tasks:,} already finished)\n")
 
+    # keep one board per equivalence class, whichever worker found it
+    canonical_solutions = {splitter.canonical_solution(solution) for solution in solutions}
+    for solution in splitter.solutions:
+        canonical = splitter.canonical_solution(solution)
+        if canonical not in canonical_solutions:
+            canonical_solutions.add(canonical)
+            solutions.append(solution)
 
-def multi_sim(process_num):
-    MultiSolver(process_num).run(save_results=False)
+    # the store is rewritten from the recovered solutions on resume, then only ever appended to
+    writer = None
+    if output_path:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        writer = SolutionWriter(output_path, len(board), len(board[0]))
+        for solution in solutions:
+            writer.write(solution)
+
+    # solutions wait here until their subproblem's next checkpoint so a resume never records them twice
+    pending_solutions = {}
+
+    iterations = splitter.iterations + sum(finished.values())
+    while remaining_tasks:
+        kind, worker_num, payload = result_queue.get()
+        if kind == "solution":
+            task_id, solution = payload
+            canonical = splitter.canonical_solution(solution)
+            if canonical not in canonical_solutions:
+                canonical_solutions.add(canonical)
+                solutions.append(solution)
+                pending_solutions.setdefault(task_id, []).append(solution)
+                if writer:
+                    writer.write(solution)
+                print(f"Worker Number: {worker_num}")
+                print(f"Solutions: {len(solutions):,}\n")
+        elif kind == "checkpoint":
+            task_id, path, task_iterations = payload
+            if log_file:
+                append_checkpoint(log_file, ("checkpoint", task_id, path, task_iterations,
+                                             pending_solutions.pop(task_id, [])))
+        else:
+            task_id, task_iterations = payload
+            if log_file:
+                append_checkpoint(log_file, ("done", task_id, task_iterations, pending_solutions.pop(task_id, [])))
+            iterations += task_iterations
+            remaining_tasks -= 1
+
+    for worker in workers:
+        worker.join()
+
+    if log_file:
+        log_file.close()
+    if writer:
+        writer.close()
+
+    return solutions, iterations
 
 
 if __name__ == "__main__":
-    processes = []
-    for i in range(7):
-        p = multiprocessing.Process(target=multi_sim, args=(i,))
-        p.start()
-        processes.append(p)
+    parser = argparse.ArgumentParser(description="Enumerate every tangram solution across several processes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--depth", type=int, default=3, help="search depth to split the work into subproblems at")
+    parser.add_argument("--checkpoint", default="stored_objects/checkpoint.pickle", help="checkpoint log to write")
+    parser.add_argument("--checkpoint-every", type=int, default=10_000_000,
+                        help="iterations of a subproblem between checkpoints")
+    parser.add_argument("--resume", action="store_true", help="carry on from the checkpoint log of an earlier run")
+    parser.add_argument("--output", default="solutions/combined.bin",
+                        help="where to write the solutions, as a binary store unless the name ends in .pickle")
+    args = parser.parse_args()
 
-    for p in processes:
-        p.join()
+    binary_output = not args.output.endswith(".pickle")
+    solutions, iterations = solve_parallel(args.workers, args.depth, checkpoint_path=args.checkpoint,
+                                           checkpoint_every=args.checkpoint_every, resume=args.resume,
+                                           output_path=args.output if binary_output else None)
+    print(f"Solutions: {len(solutions):,}")
+    print(f"Iterations: {iterations:,}")
 
-    # combine all solutions after all processes finish running
-    solutions = []
-    for i in range(7):
-        FileStore = open(f"stored_objects/solutions_duplicates_{i}.pickle", "rb")
-        row_solutions = pickle.load(FileStore)
+    if not binary_output:
+        FileStore = open(args.output, "wb")
+        pickle.dump(solutions, FileStore)
         FileStore.close()
-        solutions.extend(row_solutions)
-
-    FileStore = open("solutions/combined.pickle", "wb")
-    pickle.dump(solutions, FileStore)
-    FileStore.close()
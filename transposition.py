@@ -0,0 +1,37 @@
+from collections import OrderedDict
+
+
+class TranspositionTable:
+
+    # Bounded map from a subproblem to its result. Once full, the entry that was used least recently is
+    # dropped to make room, so the subboards the search keeps coming back to stay in the table.
+
+    def __init__(self, max_entries=1_000_000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)